@@ -0,0 +1,30 @@
+"""add user favorites unique index
+
+Revision ID: 1c7d93b5e0fa
+Revises: 9e2a4c71d6b3
+Create Date: 2026-10-18 13:31:08.770925
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c7d93b5e0fa'
+down_revision = '9e2a4c71d6b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # keep the oldest row of every duplicated (user, announcement) pair
+    op.execute("""
+        DELETE FROM user_favorites WHERE id NOT IN (
+            SELECT min(id) FROM user_favorites GROUP BY user_id, announcement_id
+        )
+    """)
+    op.create_index('ix_user_favorites_user_id_announcement_id', 'user_favorites', ['user_id', 'announcement_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_favorites_user_id_announcement_id', table_name='user_favorites')
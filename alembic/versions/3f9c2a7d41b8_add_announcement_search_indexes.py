@@ -0,0 +1,30 @@
+"""add announcement search indexes
+
+Revision ID: 3f9c2a7d41b8
+Revises: 8d3cdfedb88f
+Create Date: 2026-10-18 10:05:12.418233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d41b8'
+down_revision = '8d3cdfedb88f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_announcements_type_rooms_count_price', 'announcements', ['type', 'rooms_count', 'price'], unique=False)
+    op.create_index('ix_announcements_type_price', 'announcements', ['type', 'price'], unique=False)
+    op.create_index('ix_announcements_rooms_count_price', 'announcements', ['rooms_count', 'price'], unique=False)
+    op.create_index('ix_announcements_price', 'announcements', ['price'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_announcements_price', table_name='announcements')
+    op.drop_index('ix_announcements_rooms_count_price', table_name='announcements')
+    op.drop_index('ix_announcements_type_price', table_name='announcements')
+    op.drop_index('ix_announcements_type_rooms_count_price', table_name='announcements')
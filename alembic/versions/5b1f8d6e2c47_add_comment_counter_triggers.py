@@ -0,0 +1,39 @@
+"""add comment counter triggers
+
+Existing counts are not touched here; run `python -m app.reconcile_comments`
+once after upgrading to re-derive them in chunks.
+
+Revision ID: 5b1f8d6e2c47
+Revises: e7b350a2c8f1
+Create Date: 2026-10-18 12:20:44.610392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1f8d6e2c47'
+down_revision = 'e7b350a2c8f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TRIGGER comments_total_ai AFTER INSERT ON comments BEGIN
+            UPDATE announcements SET total_comments = coalesce(total_comments, 0) + 1, version = version + 1
+            WHERE id = new.announcement_id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER comments_total_ad AFTER DELETE ON comments BEGIN
+            UPDATE announcements SET total_comments = max(coalesce(total_comments, 0) - 1, 0), version = version + 1
+            WHERE id = old.announcement_id;
+        END
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER comments_total_ad")
+    op.execute("DROP TRIGGER comments_total_ai")
@@ -0,0 +1,24 @@
+"""add comments announcement_id index
+
+Revision ID: 9e2a4c71d6b3
+Revises: 5b1f8d6e2c47
+Create Date: 2026-10-18 13:02:51.284719
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e2a4c71d6b3'
+down_revision = '5b1f8d6e2c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_comments_announcement_id_id', 'comments', ['announcement_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_announcement_id_id', table_name='comments')
@@ -0,0 +1,24 @@
+"""add announcement version
+
+Revision ID: a61e0c5b93d2
+Revises: 3f9c2a7d41b8
+Create Date: 2026-10-18 10:41:37.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a61e0c5b93d2'
+down_revision = '3f9c2a7d41b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('announcements', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('announcements', 'version')
@@ -0,0 +1,51 @@
+"""add announcements fts
+
+Revision ID: c4d8e19f7a05
+Revises: a61e0c5b93d2
+Create Date: 2026-10-18 11:12:03.551287
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e19f7a05'
+down_revision = 'a61e0c5b93d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE VIRTUAL TABLE announcements_fts USING fts5(
+            description, address, content='announcements', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER announcements_fts_ai AFTER INSERT ON announcements BEGIN
+            INSERT INTO announcements_fts(rowid, description, address) VALUES (new.id, new.description, new.address);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER announcements_fts_ad AFTER DELETE ON announcements BEGIN
+            INSERT INTO announcements_fts(announcements_fts, rowid, description, address)
+            VALUES ('delete', old.id, old.description, old.address);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER announcements_fts_au AFTER UPDATE OF description, address ON announcements BEGIN
+            INSERT INTO announcements_fts(announcements_fts, rowid, description, address)
+            VALUES ('delete', old.id, old.description, old.address);
+            INSERT INTO announcements_fts(rowid, description, address) VALUES (new.id, new.description, new.address);
+        END
+    """)
+    # index the rows that already exist
+    op.execute("INSERT INTO announcements_fts(announcements_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER announcements_fts_au")
+    op.execute("DROP TRIGGER announcements_fts_ad")
+    op.execute("DROP TRIGGER announcements_fts_ai")
+    op.execute("DROP TABLE announcements_fts")
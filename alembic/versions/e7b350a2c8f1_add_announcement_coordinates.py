@@ -0,0 +1,49 @@
+"""add announcement coordinates
+
+Revision ID: e7b350a2c8f1
+Revises: c4d8e19f7a05
+Create Date: 2026-10-18 11:46:20.137560
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b350a2c8f1'
+down_revision = 'c4d8e19f7a05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('announcements', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('announcements', sa.Column('longitude', sa.Float(), nullable=True))
+    op.execute("CREATE VIRTUAL TABLE announcements_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+    op.execute("""
+        CREATE TRIGGER announcements_rtree_ai AFTER INSERT ON announcements
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+            INSERT INTO announcements_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER announcements_rtree_ad AFTER DELETE ON announcements BEGIN
+            DELETE FROM announcements_rtree WHERE id = old.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER announcements_rtree_au AFTER UPDATE OF latitude, longitude ON announcements BEGIN
+            DELETE FROM announcements_rtree WHERE id = old.id;
+            INSERT INTO announcements_rtree SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+            WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER announcements_rtree_au")
+    op.execute("DROP TRIGGER announcements_rtree_ad")
+    op.execute("DROP TRIGGER announcements_rtree_ai")
+    op.execute("DROP TABLE announcements_rtree")
+    op.drop_column('announcements', 'longitude')
+    op.drop_column('announcements', 'latitude')
@@ -1,12 +1,16 @@
+import math
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import HTTPException
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
 from . import models
+from .cache import announcement_cache, announcements_version
+from .pagination import ESTIMATE_COUNT_CAP, encode_cursor, seek
 
-from sqlalchemy import update, delete, func
+from sqlalchemy import update, delete, func, literal_column, select, insert
 
 
 
@@ -17,9 +21,13 @@ class AnnouncementRequest(BaseModel):
     area: float
     rooms_count: int
     description: str
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 class AnnouncementResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     type: str
     price: float
@@ -28,8 +36,27 @@ class AnnouncementResponse(BaseModel):
     rooms_count: int
     description: str
     created_at: Optional[datetime]
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     user_id: int
     total_comments: int = 0
+    version: int = 1
+
+
+class AnnouncementSearchResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    # total/total_is_estimate/next_cursor depend on the total and pagination modes;
+    # serialize with exclude_unset so each mode keeps its own keys.
+    total: Optional[int] = None
+    total_is_estimate: Optional[bool] = None
+    announcements: List[AnnouncementResponse]
+    next_cursor: Optional[str] = None
+
+
+class AnnouncementProjectionResponse(AnnouncementSearchResponse):
+    # search with fields=: each announcement carries only the requested keys
+    announcements: List[Dict[str, Any]]
 
 class AnnouncementUpdate(BaseModel):
     type: str
@@ -38,6 +65,13 @@ class AnnouncementUpdate(BaseModel):
     area: float
     rooms_count: int
     description: str
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+
+KM_PER_DEGREE = 111.195
+
+ANNOUNCEMENT_FIELDS = tuple(AnnouncementResponse.model_fields)
 
 
 class AnnouncementRepository:
@@ -46,6 +80,15 @@ class AnnouncementRepository:
     def get_announcement_by_id(db: Session, announcement_id):
         return db.query(models.Announcement).filter(models.Announcement.id == announcement_id).first()
 
+    @staticmethod
+    def get_announcements_by_ids(db: Session, announcement_ids: list):
+        """Resolve many announcements with one IN query, in the order they were asked for."""
+        found = {
+            announcement.id: announcement
+            for announcement in db.query(models.Announcement).filter(models.Announcement.id.in_(set(announcement_ids)))
+        }
+        return [found[announcement_id] for announcement_id in dict.fromkeys(announcement_ids) if announcement_id in found]
+
     @staticmethod
     def create_announcement(db: Session, announcement: AnnouncementRequest,
                             user_id: int) -> models.Announcement:
@@ -57,40 +100,229 @@ class AnnouncementRepository:
             area=announcement.area,
             rooms_count=announcement.rooms_count,
             description=announcement.description,
+            latitude=announcement.latitude,
+            longitude=announcement.longitude,
             user_id=user_id
         )
         db.add(db_announcement)
         db.commit()
+        announcements_version.bump()
         db.refresh(db_announcement)
         return db_announcement
 
     @staticmethod
-    def update_announcement(db: Session, announcement_id: int, announcement: AnnouncementRequest):
-        update_data = update(models.Announcement).where(models.Announcement.id == announcement_id).values(
+    def bulk_create_announcements(db: Session, announcements: list, user_id: int) -> int:
+        """Insert already-validated announcement dicts with a single executemany and commit."""
+        db.execute(insert(models.Announcement), [dict(announcement, user_id=user_id) for announcement in announcements])
+        db.commit()
+        announcements_version.bump()
+        return len(announcements)
+
+    @staticmethod
+    def announcement_exists(db: Session, announcement_id: int) -> bool:
+        return db.query(models.Announcement.id).filter(models.Announcement.id == announcement_id).first() is not None
+
+    @staticmethod
+    def update_announcement(db: Session, announcement_id: int, announcement: AnnouncementRequest,
+                            user_id: Optional[int] = None) -> Optional[models.Announcement]:
+        """Update in a single UPDATE ... RETURNING; None if no row matched (missing, or not owned by user_id)."""
+        update_data = update(models.Announcement).where(models.Announcement.id == announcement_id)
+        if user_id is not None:
+            update_data = update_data.where(models.Announcement.user_id == user_id)
+        # Clients from before coordinates existed send the full body without them; leave the stored ones be.
+        coordinates = announcement.model_dump(include={"latitude", "longitude"}, exclude_unset=True)
+        update_data = update_data.values(
             type=announcement.type,
             price=announcement.price,
             address=announcement.address,
             area=announcement.area,
             rooms_count=announcement.rooms_count,
-            description=announcement.description)
+            description=announcement.description,
+            version=models.Announcement.version + 1,
+            **coordinates).returning(models.Announcement)
+
+        updated_announcement = db.execute(update_data).scalar_one_or_none()
+        db.commit()
+        if updated_announcement is not None:
+            announcement_cache.invalidate(announcement_id)
+            announcements_version.bump()
+        return updated_announcement
 
+    @staticmethod
+    def delete_announcement(db: Session, announcement_id: int, user_id: Optional[int] = None) -> bool:
+        """Delete in a single DELETE ... RETURNING; False if no row matched (missing, or not owned by user_id)."""
+        delete_data = delete(models.Announcement).where(models.Announcement.id == announcement_id)
+        if user_id is not None:
+            delete_data = delete_data.where(models.Announcement.user_id == user_id)
 
-        db.execute(update_data)
+        deleted = db.execute(delete_data.returning(models.Announcement.id)).first() is not None
         db.commit()
+        if deleted:
+            announcement_cache.invalidate(announcement_id)
+            announcements_version.bump()
+        return deleted
 
-        updated_rows = db.query(models.Announcement).filter(models.Announcement.id == announcement_id)
+    @staticmethod
+    def fts_query(q: Optional[str]) -> Optional[str]:
+        # Quote every word so user input can't be parsed as FTS5 syntax; the terms are ANDed.
+        terms = ['"' + term.replace('"', '""') + '"' for term in (q or "").split()]
+        return " ".join(terms) or None
 
-        if updated_rows:
-            return db.query(models.Announcement).get(announcement_id)
+    @staticmethod
+    def geo_box(min_lat=None, max_lat=None, min_lng=None, max_lng=None, lat=None, lng=None, radius_km=None):
+        """Normalize the map parameters to (bounding box, center + radius or None), or None when unused."""
+        box = (min_lat, max_lat, min_lng, max_lng)
+        center = (lat, lng, radius_km)
+        if all(value is None for value in box + center):
+            return None
+        if all(value is not None for value in box) and all(value is None for value in center):
+            return box, None
+        if all(value is not None for value in center) and all(value is None for value in box):
+            d_lat = radius_km / KM_PER_DEGREE
+            d_lng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+            return (lat - d_lat, lat + d_lat, lng - d_lng, lng + d_lng), center
+        raise HTTPException(status_code=400,
+                            detail="Pass either min_lat, max_lat, min_lng and max_lng or lat, lng and radius_km")
 
-        raise HTTPException(status_code=404)
+    @staticmethod
+    def projection(fields: Optional[str]) -> Optional[tuple]:
+        """Parse a comma-separated fields= value into response fields, in response order; None for all."""
+        if not fields:
+            return None
+        requested = set(fields.split(","))
+        unknown = requested.difference(ANNOUNCEMENT_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail="Unknown fields: " + ", ".join(sorted(unknown)))
+        return tuple(field for field in ANNOUNCEMENT_FIELDS if field in requested)
 
     @staticmethod
-    def delete_announcement(db: Session, announcement_id: int):
-        delete_data = delete(models.Announcement).where(models.Announcement.id == announcement_id)
+    def search_announcements_query(db: Session, type: Optional[str] = None, rooms_count: Optional[int] = None,
+                                   price_from: Optional[float] = None, price_until: Optional[float] = None,
+                                   q: Optional[str] = None, geo=None):
+        query = db.query(models.Announcement)
 
-        db.execute(delete_data)
-        db.commit()
+        match = AnnouncementRepository.fts_query(q)
+        if match:
+            query = query.join(models.announcements_fts, models.announcements_fts.c.rowid == models.Announcement.id)
+            query = query.filter(literal_column("announcements_fts").op("MATCH")(match))
+        type_column, rooms_count_column, price_column = (
+            models.Announcement.type, models.Announcement.rooms_count, models.Announcement.price)
+        if geo:
+            (min_lat, max_lat, min_lng, max_lng), center = geo
+            rtree = models.announcements_rtree
+            # The R*Tree prunes to the box (its float32 bounds are rounded outwards),
+            # then the real columns are checked exactly. Without ANALYZE statistics SQLite
+            # would rather drive the search off an equality index on a filter column, so the
+            # filters compare no-op expressions that no index covers.
+            type_column = models.Announcement.type.concat("")
+            rooms_count_column = models.Announcement.rooms_count + 0
+            price_column = models.Announcement.price + 0
+            in_box = select(rtree.c.id).where(
+                rtree.c.max_lat >= min_lat, rtree.c.min_lat <= max_lat,
+                rtree.c.max_lng >= min_lng, rtree.c.min_lng <= max_lng,
+            )
+            query = query.filter(
+                models.Announcement.id.in_(in_box),
+                models.Announcement.latitude.between(min_lat, max_lat),
+                models.Announcement.longitude.between(min_lng, max_lng),
+            )
+            if center:
+                lat, lng, radius_km = center
+                # Equirectangular distance: plain arithmetic, so it needs no SQLite math
+                # functions, and well under 0.1% off at map-view radii.
+                d_lat = models.Announcement.latitude - lat
+                d_lng = (models.Announcement.longitude - lng) * math.cos(math.radians(lat))
+                query = query.filter(d_lat * d_lat + d_lng * d_lng <= (radius_km / KM_PER_DEGREE) ** 2)
+        if type:
+            query = query.filter(type_column == type)
+        if rooms_count:
+            query = query.filter(rooms_count_column == rooms_count)
+        if price_from:
+            query = query.filter(price_column >= price_from)
+        if price_until:
+            query = query.filter(price_column <= price_until)
+
+        return query
+
+    @staticmethod
+    def count_announcements(query, cap: Optional[int] = None) -> int:
+        if cap is None:
+            return query.count()
+        return query.order_by(None).with_entities(models.Announcement.id).limit(cap).count()
+
+    @staticmethod
+    def search_cache_key(limit: int, offset: int, type: Optional[str] = None, rooms_count: Optional[int] = None,
+                         price_from: Optional[float] = None, price_until: Optional[float] = None,
+                         pagination: str = "offset", cursor: Optional[str] = None, sort: str = "id",
+                         total: str = "exact", q: Optional[str] = None, geo=None,
+                         fields: Optional[tuple] = None) -> tuple:
+        # Collapse parameters that produce the same query, mirroring search_announcements_query.
+        if pagination == "offset" and cursor is None:
+            page = ("offset", offset, None, None)
+        else:
+            page = ("cursor", None, cursor or None, sort)
+        return (
+            type or None,
+            rooms_count or None,
+            float(price_from) if price_from else None,
+            float(price_until) if price_until else None,
+            AnnouncementRepository.fts_query(q),
+            geo,
+            limit,
+            total,
+            fields,
+        ) + page
+
+    @staticmethod
+    def search_announcements(db: Session, limit: int, offset: int, type: Optional[str] = None,
+                             rooms_count: Optional[int] = None, price_from: Optional[float] = None,
+                             price_until: Optional[float] = None, pagination: str = "offset",
+                             cursor: Optional[str] = None, sort: str = "id", total: str = "exact",
+                             q: Optional[str] = None, geo=None, fields: Optional[tuple] = None) -> dict:
+        """Run one search page. With fields (see projection) only those columns are selected
+        and the announcements come back as dicts holding just those keys."""
+        query = AnnouncementRepository.search_announcements_query(
+            db, type=type, rooms_count=rooms_count, price_from=price_from, price_until=price_until, q=q, geo=geo)
+
+        result = {}
+        if total == "exact":
+            result["total"] = AnnouncementRepository.count_announcements(query)
+        elif total == "estimate":
+            estimated = AnnouncementRepository.count_announcements(query, cap=ESTIMATE_COUNT_CAP)
+            result["total"] = estimated
+            result["total_is_estimate"] = estimated >= ESTIMATE_COUNT_CAP
+
+        if fields:
+            # id and the sort key are loaded for the cursor even when not asked for;
+            # raiseload turns any access to another column into an error instead of a lazy load per row.
+            loaded = set(fields) | {"id", sort}
+            query = query.options(load_only(*(getattr(models.Announcement, field) for field in loaded), raiseload=True))
+
+        if pagination == "offset" and cursor is None:
+            if AnnouncementRepository.fts_query(q):
+                # bm25() is lower for better matches
+                query = query.order_by(func.bm25(literal_column("announcements_fts")), models.Announcement.id)
+            else:
+                # explicit, so pages don't follow whichever filter index the planner picks
+                query = query.order_by(models.Announcement.id)
+            announcements = query.offset((offset - 1) * limit).limit(limit).all()
+            result["announcements"] = AnnouncementRepository.project(announcements, fields)
+            return result
+
+        # Keyset mode: fetch one extra row to know whether there is a next page.
+        announcements = seek(query, sort, cursor).limit(limit + 1).all()
+        has_next = len(announcements) > limit
+        announcements = announcements[:limit]
+
+        result["announcements"] = AnnouncementRepository.project(announcements, fields)
+        result["next_cursor"] = encode_cursor(sort, announcements[-1]) if has_next else None
+        return result
+
+    @staticmethod
+    def project(announcements: list, fields: Optional[tuple]) -> list:
+        if not fields:
+            return announcements
+        return [{field: getattr(announcement, field) for field in fields} for announcement in announcements]
 
     @staticmethod
     def get_all_announcements(db:Session):
@@ -108,3 +340,46 @@ class AnnouncementRepository:
         return comment_count
 
 
+class AsyncAnnouncementRepository:
+
+    @staticmethod
+    async def get_announcement_by_id(db: AsyncSession, announcement_id):
+        return await db.run_sync(AnnouncementRepository.get_announcement_by_id, announcement_id)
+
+    @staticmethod
+    async def get_announcements_by_ids(db: AsyncSession, announcement_ids: list):
+        return await db.run_sync(AnnouncementRepository.get_announcements_by_ids, announcement_ids)
+
+    @staticmethod
+    async def create_announcement(db: AsyncSession, announcement: AnnouncementRequest,
+                                  user_id: int) -> models.Announcement:
+        return await db.run_sync(AnnouncementRepository.create_announcement, announcement, user_id)
+
+    @staticmethod
+    async def bulk_create_announcements(db: AsyncSession, announcements: list, user_id: int) -> int:
+        return await db.run_sync(AnnouncementRepository.bulk_create_announcements, announcements, user_id)
+
+    @staticmethod
+    async def announcement_exists(db: AsyncSession, announcement_id: int) -> bool:
+        return await db.run_sync(AnnouncementRepository.announcement_exists, announcement_id)
+
+    @staticmethod
+    async def update_announcement(db: AsyncSession, announcement_id: int, announcement: AnnouncementRequest,
+                                  user_id: Optional[int] = None) -> Optional[models.Announcement]:
+        return await db.run_sync(AnnouncementRepository.update_announcement, announcement_id, announcement, user_id)
+
+    @staticmethod
+    async def delete_announcement(db: AsyncSession, announcement_id: int, user_id: Optional[int] = None) -> bool:
+        return await db.run_sync(AnnouncementRepository.delete_announcement, announcement_id, user_id)
+
+    @staticmethod
+    async def search_announcements(db: AsyncSession, **filters) -> dict:
+        return await db.run_sync(lambda session: AnnouncementRepository.search_announcements(session, **filters))
+
+    @staticmethod
+    async def get_all_announcements(db: AsyncSession):
+        return await db.run_sync(AnnouncementRepository.get_all_announcements)
+
+    @staticmethod
+    async def get_total_comments(announcement_id: int, db: AsyncSession):
+        return await db.run_sync(lambda session: AnnouncementRepository.get_total_comments(announcement_id, session))
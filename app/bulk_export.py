@@ -0,0 +1,54 @@
+"""Streaming NDJSON/CSV export for GET /shanyraks/export.
+
+Rows are selected as plain column tuples (no ORM objects, no identity map) and
+fetched ``chunk_size`` at a time through a server-side cursor, so memory stays
+flat however large the table is. The generator owns its session because the
+response outlives the request's dependencies; it comes from the export pool, and
+at most DATABASE_EXPORT_POOL_SIZE exports stream at once.
+"""
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+
+from . import database, models
+from .announcements_repository import AnnouncementRepository
+
+EXPORT_COLUMNS = [column.name for column in models.Announcement.__table__.columns]
+
+# One per export connection: further exports wait here rather than time out on the pool mid-response.
+_export_slots = asyncio.Semaphore(database.EXPORT_POOL_SIZE)
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_statement(session, **filters):
+    query = AnnouncementRepository.search_announcements_query(session, **filters)
+    columns = [getattr(models.Announcement, name) for name in EXPORT_COLUMNS]
+    return query.with_entities(*columns).order_by(models.Announcement.id).statement
+
+
+async def export_announcements(format: str, chunk_size: int, **filters):
+    async with _export_slots, database.AsyncExportSessionLocal() as db:
+        statement = export_statement(db.sync_session, **filters)
+        result = await db.stream(statement.execution_options(yield_per=chunk_size))
+
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+            async for rows in result.partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_plain(value) for value in row] for row in rows)
+                yield buffer.getvalue()
+            return
+
+        async for rows in result.partitions():
+            yield "".join(
+                json.dumps(dict(zip(EXPORT_COLUMNS, map(_plain, row))), ensure_ascii=False) + "\n" for row in rows
+            )
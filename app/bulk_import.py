@@ -0,0 +1,118 @@
+"""Streaming NDJSON/CSV import for POST /shanyraks/import.
+
+The request body is read chunk by chunk and every record is validated against
+AnnouncementRequest on its own, so a bad row is reported and skipped instead of
+failing the load. Valid rows are inserted in batches, one executemany and one
+transaction per batch.
+"""
+import codecs
+import csv
+import json
+import time
+
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+
+from .announcements_repository import AnnouncementRequest, AsyncAnnouncementRepository
+
+
+async def iter_lines(stream):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.rstrip("\r")
+
+
+async def iter_records(stream, format: str):
+    """Yield (line number, record dict or parse error message)."""
+    if format == "ndjson":
+        line_no = 0
+        async for line in iter_lines(stream):
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, f"Invalid JSON: {e}"
+                continue
+            yield line_no, record if isinstance(record, dict) else "Expected a JSON object"
+        return
+
+    header = None
+    pending, start = "", 0
+    line_no = 0
+    async for line in iter_lines(stream):
+        line_no += 1
+        # a quoted field may contain newlines: keep reading until the quotes balance
+        if pending:
+            pending += "\n" + line
+        else:
+            pending, start = line, line_no
+        if pending.count('"') % 2:
+            continue
+        text, pending = pending, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # empty CSV cells mean "not set" (e.g. no coordinates)
+        yield start, {name: value for name, value in zip(header, values) if value != ""}
+    if pending:
+        yield start, "Unterminated quoted field"
+
+
+async def import_announcements(db, stream, format: str, batch_size: int, user_id: int) -> dict:
+    started = time.perf_counter()
+    inserted = 0
+    errors = []
+    batch, batch_lines = [], []
+
+    async def flush():
+        nonlocal inserted
+        try:
+            await AsyncAnnouncementRepository.bulk_create_announcements(db, batch, user_id)
+            inserted += len(batch)
+        except SQLAlchemyError as e:
+            await db.rollback()
+            errors.extend({"line": line_no, "errors": [str(e.orig or e)]} for line_no in batch_lines)
+        batch.clear()
+        batch_lines.clear()
+
+    async for line_no, record in iter_records(stream, format):
+        if isinstance(record, str):
+            errors.append({"line": line_no, "errors": [record]})
+            continue
+        try:
+            announcement = AnnouncementRequest.model_validate(record)
+        except ValidationError as e:
+            errors.append({"line": line_no, "errors": [
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ]})
+            continue
+        batch.append(announcement.model_dump())
+        batch_lines.append(line_no)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    seconds = time.perf_counter() - started
+    return {
+        "inserted": inserted,
+        "failed": len(errors),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(inserted / seconds, 1) if seconds else None,
+    }
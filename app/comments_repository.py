@@ -2,34 +2,40 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import HTTPException
-from sqlalchemy import update,delete
-from pydantic import BaseModel
+from sqlalchemy import update,delete, and_
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from . import models
-from .announcements_repository import AnnouncementRepository
+from .cache import announcement_cache, announcements_version
+from .pagination import decode_cursor, encode_cursor
 
 
 class CommentRequest(BaseModel):
     content: str
 
 class CommentResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     content: str
     user_id: int
+    announcement_id: Optional[int] = None
     created_at: Optional[datetime]
 
 
 class CommentRepository:
     @staticmethod
     def create_comment(db: Session, user_id, announcement_id, comment: CommentRequest):
+        if not db.query(models.Announcement.id).filter(models.Announcement.id == announcement_id).first():
+            raise HTTPException(status_code=404, detail="Announcement not found")
+
+        # total_comments is bumped by the comments_total_ai trigger
         db_comment = models.Comment(content=comment.content, user_id=user_id, announcement_id=announcement_id)
         db.add(db_comment)
-        query = update(models.Announcement).where(models.Announcement.id == announcement_id).values(
-            total_comments=AnnouncementRepository.get_total_comments(announcement_id, db) + 1)
-        db.execute(query)
-
-
         db.commit()
+        announcement_cache.invalidate(announcement_id)
+        announcements_version.bump()
         db.refresh(db_comment)
         return db_comment
 
@@ -39,31 +45,90 @@ class CommentRepository:
 
     @staticmethod
     def get_comment_by_comment_id(db: Session, announcement_id, comment_id):
-        return db.query(models.Comment).filter(models.Comment.id == comment_id and models.Comment.announcement_id == announcement_id).first()
+        return db.query(models.Comment).filter(models.Comment.id == comment_id,
+                                               models.Comment.announcement_id == announcement_id).first()
 
     @staticmethod
-    def get_announcement_comments(announcement_id: int, db: Session):
-        announcement = db.query(models.Announcement).filter(models.Announcement.id == announcement_id).first()
-        if not announcement:
+    def comment_exists(db: Session, announcement_id, comment_id) -> bool:
+        return db.query(models.Comment.id).filter(models.Comment.id == comment_id,
+                                                  models.Comment.announcement_id == announcement_id).first() is not None
+
+    @staticmethod
+    def get_announcement_comments(announcement_id: int, db: Session, limit: int = 50, cursor: Optional[str] = None):
+        """Return (comments, next_cursor) for one page, 404 if the announcement does not exist.
+
+        The announcement is outer-joined to its comments, so existence and the page
+        come back in one round trip: no rows means no announcement, a NULL comment
+        means no comments (after the cursor).
+        """
+        after_id = decode_cursor(cursor, "id")[1] if cursor else 0
+        rows = db.query(models.Announcement.id, models.Comment).outerjoin(
+            models.Comment,
+            and_(models.Comment.announcement_id == models.Announcement.id, models.Comment.id > after_id)
+        ).filter(models.Announcement.id == announcement_id).order_by(models.Comment.id).limit(limit + 1).all()
+        if not rows:
             raise HTTPException(status_code=404, detail="Announcement not found")
 
-        comments = db.query(models.Comment).filter(models.Comment.announcement_id == announcement_id).all()
-        return comments
+        comments = [comment for _, comment in rows if comment is not None]
+        next_cursor = encode_cursor("id", comments[limit - 1]) if len(comments) > limit else None
+        return comments[:limit], next_cursor
 
     @staticmethod
     def update_comment(db: Session, announcement_id, comment_id, user_id, comment:CommentRequest):
-        updating_comment = update(models.Comment).filter(models.Comment.id == comment_id and models.Comment.announcement_id == announcement_id and models.Comment.user_id == user_id).values(content = comment.content)
-        db.execute(updating_comment)
+        """Update in a single UPDATE ... RETURNING; None if no comment of user_id matched."""
+        updating_comment = update(models.Comment).where(
+            models.Comment.id == comment_id,
+            models.Comment.announcement_id == announcement_id,
+            models.Comment.user_id == user_id,
+        ).values(content=comment.content).returning(models.Comment)
+        updated_comment = db.execute(updating_comment).scalar_one_or_none()
         db.commit()
-        updated_comment = db.query(models.Comment).get(comment_id)
-        if updated_comment:
-            return updated_comment
-        raise HTTPException(status_code=404,detail="The comment not found")
+        return updated_comment
 
     @staticmethod
-    def delete_comment(db: Session, announcement_id, comment_id, user_id):
-        deleting_comment = delete(models.Comment).filter(models.Comment.id == comment_id and models.Comment.announcement_id == announcement_id and models.Comment.user_id == user_id)
-        db.execute(deleting_comment)
+    def delete_comment(db: Session, announcement_id, comment_id, user_id) -> bool:
+        """Delete in a single DELETE ... RETURNING; False if no comment of user_id matched."""
+        deleting_comment = delete(models.Comment).where(
+            models.Comment.id == comment_id,
+            models.Comment.announcement_id == announcement_id,
+            models.Comment.user_id == user_id,
+        ).returning(models.Comment.id)
+        deleted = db.execute(deleting_comment).first() is not None
         db.commit()
-        return True
+        if deleted:
+            # total_comments is decremented by the comments_total_ad trigger
+            announcement_cache.invalidate(announcement_id)
+            announcements_version.bump()
+        return deleted
+
+
+class AsyncCommentRepository:
+    @staticmethod
+    async def create_comment(db: AsyncSession, user_id, announcement_id, comment: CommentRequest):
+        return await db.run_sync(CommentRepository.create_comment, user_id, announcement_id, comment)
 
+    @staticmethod
+    async def get_comment_by_announcement_id(db: AsyncSession, announcement_id):
+        return await db.run_sync(CommentRepository.get_comment_by_announcement_id, announcement_id)
+
+    @staticmethod
+    async def get_comment_by_comment_id(db: AsyncSession, announcement_id, comment_id):
+        return await db.run_sync(CommentRepository.get_comment_by_comment_id, announcement_id, comment_id)
+
+    @staticmethod
+    async def comment_exists(db: AsyncSession, announcement_id, comment_id) -> bool:
+        return await db.run_sync(CommentRepository.comment_exists, announcement_id, comment_id)
+
+    @staticmethod
+    async def get_announcement_comments(announcement_id: int, db: AsyncSession, limit: int = 50,
+                                        cursor: Optional[str] = None):
+        return await db.run_sync(
+            lambda session: CommentRepository.get_announcement_comments(announcement_id, session, limit, cursor))
+
+    @staticmethod
+    async def update_comment(db: AsyncSession, announcement_id, comment_id, user_id, comment: CommentRequest):
+        return await db.run_sync(CommentRepository.update_comment, announcement_id, comment_id, user_id, comment)
+
+    @staticmethod
+    async def delete_comment(db: AsyncSession, announcement_id, comment_id, user_id):
+        return await db.run_sync(CommentRepository.delete_comment, announcement_id, comment_id, user_id)
@@ -1,13 +1,33 @@
+from typing import List, Optional
+
 from fastapi import HTTPException
 from sqlalchemy import update,delete
-from pydantic import BaseModel
+from sqlalchemy.dialects.sqlite import insert
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from . import models
+from .announcements_repository import AnnouncementResponse
+from .pagination import decode_cursor, encode_cursor
 
 
 class FavoriteResponse(BaseModel):
     announcement_id: int
 
+
+class FavoriteAnnouncementResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: int
+    announcement_id: int
+    announcement: AnnouncementResponse
+
+
+class FavoriteBatchRequest(BaseModel):
+    add: List[int] = Field(default_factory=list, max_length=500)
+    remove: List[int] = Field(default_factory=list, max_length=500)
+
 class FavoriteRepository:
 
     @staticmethod
@@ -16,25 +36,94 @@ class FavoriteRepository:
         if not get_announcement:
             raise HTTPException(status_code=404, detail="Announcement not found")
 
-        favorite = models.UserFavorite(announcement_id=announcement_id, user_id=user_id)
-        db.add(favorite)
+        # adding the same announcement twice is a no-op
+        added = db.execute(insert(models.UserFavorite).values(announcement_id=announcement_id, user_id=user_id)
+                           .on_conflict_do_nothing(index_elements=["user_id", "announcement_id"])).rowcount
+        db.commit()
+        return bool(added)
+
+    @staticmethod
+    def update_favorites(db: Session, user_id: int, add: List[int], remove: List[int]) -> dict:
+        """Apply a batch of adds and removes in one transaction.
+
+        Announcements to add are checked with a single IN query; unknown ids are
+        reported back instead of failing the batch.
+        """
+        add, remove = sorted(set(add)), sorted(set(remove))
+        found = set()
+        if add:
+            found = {row.id for row in db.query(models.Announcement.id).filter(models.Announcement.id.in_(add))}
+            if found:
+                db.execute(insert(models.UserFavorite).on_conflict_do_nothing(
+                    index_elements=["user_id", "announcement_id"]),
+                    [{"user_id": user_id, "announcement_id": announcement_id} for announcement_id in sorted(found)])
+        if remove:
+            db.execute(delete(models.UserFavorite).where(
+                models.UserFavorite.user_id == user_id, models.UserFavorite.announcement_id.in_(remove)))
         db.commit()
-        db.refresh(favorite)
-        return favorite
+        return {
+            "added": sorted(found),
+            "removed": remove,
+            "not_found": [announcement_id for announcement_id in add if announcement_id not in found],
+        }
 
     @staticmethod
-    def get_all_favorites(user_id: int, db: Session):
-        return db.query(models.UserFavorite).where(models.UserFavorite.user_id == user_id).all()
+    def get_all_favorites(user_id: int, db: Session, limit: int = 50, cursor: Optional[str] = None):
+        """Return (favorites with their announcements, next_cursor), joined in one query.
+
+        Pages are ordered by announcement_id so they are read straight off the
+        (user_id, announcement_id) index.
+        """
+        query = db.query(models.UserFavorite, models.Announcement).join(
+            models.Announcement, models.Announcement.id == models.UserFavorite.announcement_id
+        ).filter(models.UserFavorite.user_id == user_id)
+        if cursor:
+            after_announcement_id = decode_cursor(cursor, "announcement_id")[0]
+            query = query.filter(models.UserFavorite.announcement_id > after_announcement_id)
+        rows = query.order_by(models.UserFavorite.announcement_id).limit(limit + 1).all()
+
+        favorites = [
+            {"id": favorite.id, "user_id": favorite.user_id, "announcement_id": favorite.announcement_id,
+             "announcement": announcement}
+            for favorite, announcement in rows[:limit]
+        ]
+        next_cursor = encode_cursor("announcement_id", rows[limit - 1][0]) if len(rows) > limit else None
+        return favorites, next_cursor
 
     @staticmethod
-    def delete_favorite(db: Session, favorite_id):
+    def delete_favorite(db: Session, favorite_id, user_id: Optional[int] = None) -> bool:
+        """Delete in a single DELETE ... RETURNING; False if no row matched (missing, or not owned by user_id)."""
         deleting_favorite = delete(models.UserFavorite).where(
             models.UserFavorite.id == favorite_id)
-        db.execute(deleting_favorite)
+        if user_id is not None:
+            deleting_favorite = deleting_favorite.where(models.UserFavorite.user_id == user_id)
+        deleted = db.execute(deleting_favorite.returning(models.UserFavorite.id)).first() is not None
         db.commit()
-        return True
+        return deleted
 
     @staticmethod
     def get_favorite_by_id(db: Session, favorite_id):
         return db.query(models.UserFavorite).where(models.UserFavorite.id == favorite_id).first()
 
+
+class AsyncFavoriteRepository:
+
+    @staticmethod
+    async def add_to_favorites(db: AsyncSession, announcement_id, user_id):
+        return await db.run_sync(FavoriteRepository.add_to_favorites, announcement_id, user_id)
+
+    @staticmethod
+    async def update_favorites(db: AsyncSession, user_id: int, add: List[int], remove: List[int]) -> dict:
+        return await db.run_sync(FavoriteRepository.update_favorites, user_id, add, remove)
+
+    @staticmethod
+    async def get_all_favorites(user_id: int, db: AsyncSession, limit: int = 50, cursor: Optional[str] = None):
+        return await db.run_sync(lambda session: FavoriteRepository.get_all_favorites(user_id, session, limit, cursor))
+
+    @staticmethod
+    async def delete_favorite(db: AsyncSession, favorite_id, user_id: Optional[int] = None) -> bool:
+        return await db.run_sync(FavoriteRepository.delete_favorite, favorite_id, user_id)
+
+    @staticmethod
+    async def get_favorite_by_id(db: AsyncSession, favorite_id):
+        return await db.run_sync(FavoriteRepository.get_favorite_by_id, favorite_id)
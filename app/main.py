@@ -1,260 +1,393 @@
-from typing import Optional
+import os
+from typing import List, Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Form, Query
+from fastapi import FastAPI, Depends, HTTPException, Form, Query, Header, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-
-from .user_repository import UsersRepository, UserRequest, UserResponse, UserUpdate
-from .announcements_repository import AnnouncementRepository, AnnouncementRequest, AnnouncementResponse
-from .comments_repository import CommentRepository, CommentRequest, CommentResponse
-from .favorites_repository import FavoriteResponse, FavoriteRepository
-from . import database
-from jose import jwt
-
-from . import models
-
-database.Base.metadata.create_all(bind=database.engine)
-
-app = FastAPI()
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .user_repository import AsyncUsersRepository, UserRequest, UserResponse, UserUpdate
+from .announcements_repository import AnnouncementRepository, AsyncAnnouncementRepository, AnnouncementRequest, AnnouncementResponse, AnnouncementSearchResponse, AnnouncementProjectionResponse
+from .comments_repository import AsyncCommentRepository, CommentRequest, CommentResponse
+from .favorites_repository import FavoriteAnnouncementResponse, FavoriteBatchRequest, FavoriteResponse, AsyncFavoriteRepository
+from . import database, metrics
+from .bulk_import import import_announcements as import_announcements_stream
+from .bulk_export import export_announcements as export_announcements_stream
+from .cache import announcement_cache, announcements_version, etag_matches, make_etag, search_cache, token_cache, user_cache
+from .startup import lifespan
+from .security import check_admin_token, create_access_token, decode_access_token, hash_password, needs_rehash, verify_password
+
+try:
+    import orjson
+except ImportError:  # optional: install the "fast" extra
+    orjson = None
+
+DefaultJSONResponse = ORJSONResponse if orjson else JSONResponse
+
+# Responses smaller than this are sent as is; compressing them costs more than it saves.
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+
+app = FastAPI(default_response_class=DefaultJSONResponse, lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+# added last so it is outermost and times the whole request
+app.add_middleware(metrics.MetricsMiddleware)
+
+for engine in (database.engine, database.async_engine.sync_engine, database.async_read_engine.sync_engine,
+               database.async_export_engine.sync_engine):
+    metrics.instrument_engine(engine)
+for name, cache in (("user", user_cache), ("token", token_cache), ("announcement", announcement_cache),
+                    ("search", search_cache)):
+    metrics.register_cache(name, cache)
 oauth2_schema = OAuth2PasswordBearer(tokenUrl="auth/users/login")
 
-user_repo = UsersRepository()
-announcement_repo = AnnouncementRepository()
-comment_repo = CommentRepository()
-fav_repo = FavoriteRepository()
-
-def encode(email: str) -> str:
-    body = {"email": email}
-    return jwt.encode(body, "lluna", algorithm="HS256")
+user_repo = AsyncUsersRepository()
+announcement_repo = AsyncAnnouncementRepository()
+comment_repo = AsyncCommentRepository()
+fav_repo = AsyncFavoriteRepository()
 
-
-def decode(token: str) -> str:
-    data = jwt.decode(token, "lluna", algorithms=["HS256"])
-    return data["email"]
+async def get_db() -> AsyncSession:
+    db = database.AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
 
 
-def get_db() -> Session:
-    db = database.SessionLocal()
+async def get_read_db() -> AsyncSession:
+    db = database.AsyncReadSessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
 
-def verificate_user(token: str = Depends(oauth2_schema), db: Session = Depends(get_db)):
-    user_email = decode(token)
-    user = user_repo.get_user_by_email(db, user_email)
-    if not user:
+async def current_user_id(token: str = Depends(oauth2_schema)) -> int:
+    # The id comes from the signed token; no users-table lookup.
+    return decode_access_token(token)
+
+
+async def verificate_user(user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_read_db)):
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    db_user = await user_repo.get_user_by_id(db, user_id)
+    if not db_user:
         raise HTTPException(status_code=404, detail="Not user such number")
 
+    user = UserResponse.model_validate(db_user, from_attributes=True)
+    user_cache.set(user_id, user)
     return user
 
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    check_admin_token(x_admin_token)
+
+
+@app.get("/admin/slow-queries", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def get_slow_queries(limit: int = Query(50, gt=0, le=500), min_ms: float = Query(0, ge=0)):
+    log = database.slow_query_log
+    if log is None:
+        raise HTTPException(status_code=404, detail="Slow query log is off; set SLOW_QUERY_MS to enable it")
+    return {"threshold_ms": log.threshold * 1000, "skipped": log.skipped, "queries": log.recent(limit, min_ms)}
+
+
 @app.post("/auth/users/", tags=["Register"], response_model=UserResponse)
-def auth(user: UserRequest, db: Session = Depends(get_db)) -> UserResponse:
-    existing_user = user_repo.get_user_by_email(db, user.email)
+async def auth(user: UserRequest, db: AsyncSession = Depends(get_read_db),
+               writer: AsyncSession = Depends(get_db)) -> UserResponse:
+    existing_user = await user_repo.get_user_by_email(db, user.email)
+    # don't hold a pooled connection for the length of a hash
+    await db.rollback()
     if existing_user:
         raise HTTPException(status_code=409, detail="Phone number or email already taken")
-    created_user = user_repo.create_user(db, user)
+    user = user.model_copy(update={"password": await hash_password(user.password)})
+    created_user = await user_repo.create_user(writer, user)
     return created_user
 
 #
 @app.post("/auth/users/login", tags=["Login"], response_model=dict)
-def login(username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)) -> dict:
+async def login(username: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_read_db),
+                writer: AsyncSession = Depends(get_db)) -> dict:
     if "@" in username:
-        user = user_repo.get_user_by_email(db, username)
+        user = await user_repo.get_user_by_email(db, username)
     else:
-        user = user_repo.get_user_by_phone(db,  username)
+        user = await user_repo.get_user_by_phone(db,  username)
+    user_id, stored = (user.id, user.password) if user else (None, None)
+    # don't hold a pooled connection for the length of a hash
+    await db.rollback()
 
-    if user is None or user.password != password:
+    if not await verify_password(password, stored) or user_id is None:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    access_token = encode(user.email)
+    if needs_rehash(stored):
+        # plaintext rows and hashes from an older cost are upgraded on the first successful login
+        await user_repo.update_password(writer, user_id, await hash_password(password))
+    access_token = create_access_token(user_id)
     return {"access_token": access_token}
 
 
 @app.patch("/auth/users/me", tags=["Updated user info"])
-def update_profile(userupdate: UserUpdate, user: UserRequest = Depends(verificate_user), db: Session = Depends(get_db)):
-    user_repo.updated_user(db, user, userupdate)
+async def update_profile(userupdate: UserUpdate, user_id: int = Depends(current_user_id), db: AsyncSession = Depends(get_db)):
+    await user_repo.updated_user(db, user_id, userupdate)
     return {"messages": "your profile updated"}
 
 @app.get("/auth/users/me", tags=["Profile"])
-def get_profile(user=Depends(verificate_user), db: Session = Depends(get_db)):
+async def get_profile(user=Depends(verificate_user), db: AsyncSession = Depends(get_read_db)):
     return user
 
-@app.get("/shanyraks/search", tags=["Search Announcements"])
-def search_announcements(
+@app.get("/shanyraks", tags=["Get Announcements"], response_model=List[AnnouncementResponse])
+async def get_announcements(
+        ids: str = Query(..., regex=r"^\d+(,\d+){0,99}$", examples=["1,2,3"]),
+        db: AsyncSession = Depends(get_read_db)
+):
+    return await announcement_repo.get_announcements_by_ids(db, [int(id) for id in ids.split(",")])
+
+@app.get("/shanyraks/search", tags=["Search Announcements"], response_model=AnnouncementSearchResponse)
+async def search_announcements(
         limit: int = Query(5, gt=0),
         offset: int = Query(1, ge=1),
         type: Optional[str] = Query(None, regex="^(sell|rent)$", examples=['sell', 'rent']),
         rooms_count: Optional[int] = Query(None, gt=0),
         price_from: Optional[float] = Query(None, ge=0),
         price_until: Optional[float] = Query(None, ge=0),
-        db: Session = Depends(get_db)
+        pagination: str = Query("offset", regex="^(offset|cursor)$"),
+        cursor: Optional[str] = Query(None),
+        sort: str = Query("id", regex="^(id|price|created_at)$"),
+        total: str = Query("exact", regex="^(exact|estimate|none)$"),
+        q: Optional[str] = Query(None, max_length=200),
+        min_lat: Optional[float] = Query(None, ge=-90, le=90),
+        max_lat: Optional[float] = Query(None, ge=-90, le=90),
+        min_lng: Optional[float] = Query(None, ge=-180, le=180),
+        max_lng: Optional[float] = Query(None, ge=-180, le=180),
+        lat: Optional[float] = Query(None, ge=-90, le=90),
+        lng: Optional[float] = Query(None, ge=-180, le=180),
+        radius_km: Optional[float] = Query(None, gt=0, le=500),
+        fields: Optional[str] = Query(None, regex=r"^[a-z_]+(,[a-z_]+)*$", examples=["id,price,address"]),
+        db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(models.Announcement)
-
-    if type:
-        query = query.filter(models.Announcement.type == type)
-    if rooms_count:
-        query = query.filter(models.Announcement.rooms_count == rooms_count)
-    if price_from:
-        query = query.filter(models.Announcement.price >= price_from)
-    if price_until:
-        query = query.filter(models.Announcement.price <= price_until)
-
-    total_announcements = query.count()
-    announcements = query.offset((offset - 1) * limit).limit(limit).all()
-
-    return {
-        "total": total_announcements,
-        "announcements": announcements
-
-    }
+    projection = AnnouncementRepository.projection(fields)
+    geo = AnnouncementRepository.geo_box(min_lat=min_lat, max_lat=max_lat, min_lng=min_lng, max_lng=max_lng,
+                                         lat=lat, lng=lng, radius_km=radius_km)
+    filters = dict(limit=limit, offset=offset, type=type, rooms_count=rooms_count, price_from=price_from,
+                   price_until=price_until, pagination=pagination, cursor=cursor, sort=sort, total=total, q=q,
+                   geo=geo, fields=projection)
+    # Read the version before querying so a write that lands mid-query can't be cached under the new one.
+    key = (announcements_version.value,) + AnnouncementRepository.search_cache_key(**filters)
+    body = search_cache.get(key)
+    if body is None:
+        result = await announcement_repo.search_announcements(db, **filters)
+        schema = AnnouncementProjectionResponse if projection else AnnouncementSearchResponse
+        body = schema.model_validate(result).model_dump_json(exclude_unset=True).encode()
+        search_cache.set(key, body)
+    return Response(content=body, media_type="application/json")
+
+@app.get("/shanyraks/export", tags=["Export Announcements"])
+async def export_announcements(
+        format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+        chunk_size: int = Query(1000, gt=0, le=10000),
+        type: Optional[str] = Query(None, regex="^(sell|rent)$", examples=['sell', 'rent']),
+        rooms_count: Optional[int] = Query(None, gt=0),
+        price_from: Optional[float] = Query(None, ge=0),
+        price_until: Optional[float] = Query(None, ge=0),
+        q: Optional[str] = Query(None, max_length=200),
+        min_lat: Optional[float] = Query(None, ge=-90, le=90),
+        max_lat: Optional[float] = Query(None, ge=-90, le=90),
+        min_lng: Optional[float] = Query(None, ge=-180, le=180),
+        max_lng: Optional[float] = Query(None, ge=-180, le=180),
+        lat: Optional[float] = Query(None, ge=-90, le=90),
+        lng: Optional[float] = Query(None, ge=-180, le=180),
+        radius_km: Optional[float] = Query(None, gt=0, le=500),
+):
+    geo = AnnouncementRepository.geo_box(min_lat=min_lat, max_lat=max_lat, min_lng=min_lng, max_lng=max_lng,
+                                         lat=lat, lng=lng, radius_km=radius_km)
+    stream = export_announcements_stream(format, chunk_size, type=type, rooms_count=rooms_count,
+                                         price_from=price_from, price_until=price_until, q=q, geo=geo)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(stream, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="announcements.{format}"'})
 
 @app.post("/shanyraks/", tags=["Create Announcement"], response_model=AnnouncementResponse)
-def create_announcement(
+async def create_announcement(
     announcement_data: AnnouncementRequest,
-    user: UserResponse = Depends(verificate_user),
-    db: Session = Depends(get_db)
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_db)
 ) -> AnnouncementResponse:
-    created_announcement = announcement_repo.create_announcement(db=db, announcement=announcement_data, user_id=user.id)
+    created_announcement = await announcement_repo.create_announcement(db=db, announcement=announcement_data, user_id=user_id)
     return created_announcement
 
-@app.get("/shanyraks/{id}", tags=["Get Announcement"])
-def get_announcement(id: int, db: Session = Depends(get_db)):
-    announcement = announcement_repo.get_announcement_by_id(db, id)
-    if not announcement:
-        raise HTTPException(status_code=404, detail="Announcement does not exist")
-    return announcement
+@app.post("/shanyraks/import", tags=["Import Announcements"])
+async def import_announcements(
+        request: Request,
+        format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+        batch_size: int = Query(500, gt=0, le=5000),
+        user_id: int = Depends(current_user_id),
+        db: AsyncSession = Depends(get_db)
+):
+    return await import_announcements_stream(db, request.stream(), format=format, batch_size=batch_size, user_id=user_id)
+
+@app.get("/shanyraks/{id}", tags=["Get Announcement"], response_model=AnnouncementResponse)
+async def get_announcement(id: int, if_none_match: Optional[str] = Header(None),
+                           db: AsyncSession = Depends(get_read_db)):
+    cached = announcement_cache.get(id)
+    if cached is None:
+        # Read the generation before querying so a write that lands mid-query isn't cached over.
+        generation = announcement_cache.generation
+        announcement = await announcement_repo.get_announcement_by_id(db, id)
+        if not announcement:
+            raise HTTPException(status_code=404, detail="Announcement does not exist")
+        body = AnnouncementResponse.model_validate(announcement).model_dump_json().encode()
+        cached = (make_etag(announcement.id, body), body)
+        announcement_cache.set(id, cached, generation)
+
+    etag, body = cached
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 
 
 @app.patch("/shanyraks/{id_announcement}", tags=["Update Announcement"])
-def update_announcement(
+async def update_announcement(
         id_announcement: int,
         announcement: AnnouncementRequest,
-        current_user: UserResponse = Depends(verificate_user),
-        db: Session = Depends(get_db)
+        user_id: int = Depends(current_user_id),
+        db: AsyncSession = Depends(get_db)
 ):
-    updating_announcement = announcement_repo.get_announcement_by_id(db, id_announcement)
-    if not updating_announcement:
+    # One conditional UPDATE does the ownership check; only a miss costs a second query.
+    updated = await announcement_repo.update_announcement(db, id_announcement, announcement, user_id=user_id)
+    if not updated:
+        if await announcement_repo.announcement_exists(db, id_announcement):
+            raise HTTPException(status_code=403, detail="You are not authorized to update this announcement")
         raise HTTPException(status_code=404, detail="The announcement not found")
-    if updating_announcement.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You are not authorized to update this announcement")
 
-    announcement_repo.update_announcement(db, id_announcement, announcement)
     return {"message": "Successfully updated"}
 
 
 @app.delete("/shanyraks/{id_announcement}", tags=["Delete Announcement"])
-def deleting_announcement(
+async def deleting_announcement(
         id_announcement: int,
-        current_user: UserResponse = Depends(verificate_user),
-        db: Session = Depends(get_db)
+        user_id: int = Depends(current_user_id),
+        db: AsyncSession = Depends(get_db)
 ):
-    delete_announcement = announcement_repo.get_announcement_by_id(db, id_announcement)
-    if not delete_announcement:
+    deleted = await announcement_repo.delete_announcement(db, id_announcement, user_id=user_id)
+    if not deleted:
+        if await announcement_repo.announcement_exists(db, id_announcement):
+            raise HTTPException(status_code=403, detail="You are not authorized to delete this announcement")
         raise HTTPException(status_code=404, detail="The announcement not found")
-    if delete_announcement.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You are not authorized to delete this announcement")
 
-    announcement_repo.delete_announcement(db, id_announcement)
     return {"message": "Successfully deleted"}
 
 
 
 @app.post("/shanyraks/{id}/comments", tags=["Add comment"], response_model=CommentResponse)
-def create_comment(comment: CommentRequest,
+async def create_comment(comment: CommentRequest,
     id_announcement: int,
-    user: UserResponse = Depends(verificate_user),
-    db: Session = Depends(get_db)
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_db)
 ):
 
-    created_comment = comment_repo.create_comment(db=db, comment=comment, announcement_id=id_announcement, user_id=user.id)
+    created_comment = await comment_repo.create_comment(db=db, comment=comment, announcement_id=id_announcement, user_id=user_id)
     return created_comment
 
 
-@app.get("/shanyraks/{id}/comments", tags=["Get comments"])
-def get_comment(
+@app.get("/shanyraks/{id}/comments", tags=["Get comments"], response_model=List[CommentResponse])
+async def get_comment(
     id_announcement: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(50, gt=0, le=200),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    comments = comment_repo.get_announcement_comments(db=db, announcement_id=id_announcement)
+    comments, next_cursor = await comment_repo.get_announcement_comments(
+        db=db, announcement_id=id_announcement, limit=limit, cursor=cursor)
+    # the body stays a plain list for existing clients; the next page is advertised in a header
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return comments
 
 
 @app.patch("/shanyraks/{id}/comments/{comment_id}", tags=["Update Comment"])
-def update_comment(
+async def update_comment(
         comment: CommentRequest,
         id_announcement: int,
         comment_id: int,
-        current_user: UserResponse = Depends(verificate_user),
-        db: Session = Depends(get_db)
+        user_id: int = Depends(current_user_id),
+        db: AsyncSession = Depends(get_db)
 ):
-    updating_comment = comment_repo.get_comment_by_comment_id(db, comment_id, id_announcement)
-
-    if not updating_comment:
+    updated = await comment_repo.update_comment(db, id_announcement, comment_id, user_id=user_id, comment=comment)
+    if not updated:
+        if await comment_repo.comment_exists(db, id_announcement, comment_id):
+            raise HTTPException(status_code=403, detail="You are not authorized to update this comment")
         raise HTTPException(status_code=404, detail="The comment not found")
-    if updating_comment.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You are not authorized to update this comment")
 
-    comment_repo.update_comment(db, id_announcement, comment_id, user_id=current_user.id, comment=comment)
     return {"message": "Successfully updated"}
 
 
 
 @app.delete("/shanyraks/{id}/comments/{comment_id}", tags=["Delete Comment"])
-def delete_comment(
+async def delete_comment(
         id_announcement: int,
         comment_id:int,
-        current_user: UserResponse = Depends(verificate_user),
-        db: Session = Depends(get_db)
+        user_id: int = Depends(current_user_id),
+        db: AsyncSession = Depends(get_db)
 ):
-    deleting_comment = comment_repo.get_comment_by_comment_id(db, comment_id, id_announcement)
-
-    if not deleting_comment:
+    deleted = await comment_repo.delete_comment(db, id_announcement, comment_id, user_id=user_id)
+    if not deleted:
+        if await comment_repo.comment_exists(db, id_announcement, comment_id):
+            raise HTTPException(status_code=403, detail="You are not authorized to delete this comment")
         raise HTTPException(status_code=404, detail="The comment not found")
-    if deleting_comment.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You are not authorized to delete this comment")
 
-    comment_repo.delete_comment(db, id_announcement, comment_id, user_id=current_user.id)
     return {"message": "Successfully deleted"}
 
 
 @app.post("/auth/users/favorites/shanyraks/{id}", tags=["Add to Favorites"], response_model=dict)
-def add_to_favorites(
+async def add_to_favorites(
         id: int,
-        user: UserResponse = Depends(verificate_user),
-        db: Session = Depends(get_db)
+        user_id: int = Depends(current_user_id),
+        db: AsyncSession = Depends(get_db)
 ):
-    announcement = announcement_repo.get_announcement_by_id(db, id)
-    if not announcement:
-        raise HTTPException(status_code=404, detail="Announcement not found")
-
-    fav_repo.add_to_favorites(db, id, user.id)
+    # the repository answers 404 for an unknown announcement
+    await fav_repo.add_to_favorites(db, id, user_id)
 
     return {"message": "Announcement added to favorites successfully"}
 
-@app.get("/auth/users/favorites/shanyraks", tags=["Get Favorites"])
-def get_all_favorites(user: UserResponse = Depends(verificate_user),
-    db: Session = Depends(get_db)
+@app.patch("/auth/users/favorites/shanyraks", tags=["Update Favorites"])
+async def update_favorites(
+        favorites: FavoriteBatchRequest,
+        user_id: int = Depends(current_user_id),
+        db: AsyncSession = Depends(get_db)
+):
+    return await fav_repo.update_favorites(db, user_id, favorites.add, favorites.remove)
+
+@app.get("/auth/users/favorites/shanyraks", tags=["Get Favorites"], response_model=List[FavoriteAnnouncementResponse])
+async def get_all_favorites(response: Response,
+    limit: int = Query(50, gt=0, le=200),
+    cursor: Optional[str] = Query(None),
+    user_id: int = Depends(current_user_id),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    favorites = fav_repo.get_all_favorites(user.id, db)
-    return favorites or []
+    favorites, next_cursor = await fav_repo.get_all_favorites(user_id, db, limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return favorites
 
 @app.delete("/auth/users/favorites/shanyraks/{id}", tags=["Delete Favorite"])
-def delete_favorite(
+async def delete_favorite(
         favorite_id: int,
-        current_user: UserResponse = Depends(verificate_user),
-        db: Session = Depends(get_db)
+        user_id: int = Depends(current_user_id),
+        db: AsyncSession = Depends(get_db)
 ):
-    deleting_favorite = fav_repo.get_favorite_by_id(db, favorite_id)
-    if not deleting_favorite:
+    deleted = await fav_repo.delete_favorite(db, favorite_id, user_id=user_id)
+    if not deleted:
+        if await fav_repo.get_favorite_by_id(db, favorite_id):
+            raise HTTPException(status_code=403, detail="You are not authorized to delete")
         raise HTTPException(status_code=404, detail="Favorite is not found")
-    if deleting_favorite.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You are not authorized to delete")
 
-    fav_repo.delete_favorite(db, favorite_id)
     return {"message": "Successfully deleted"}
 
 
@@ -0,0 +1,191 @@
+"""In-process request, SQL and cache metrics, rendered in the Prometheus text format.
+
+Everything here is a few dict lookups and additions under a lock per event, cheap enough to
+leave on in production. Routes are labelled by their path template, never the raw path.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21, 50)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple, labels: tuple = ()):
+        self.name, self.help, self.buckets, self.labels = name, help, buckets, labels
+        self._values = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: tuple = ()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labels + ('le',), labels + (bound,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency by route.", LATENCY_BUCKETS,
+                         ("method", "route"))
+request_statements = Histogram("http_request_db_statements", "SQL statements executed per HTTP request.",
+                               STATEMENT_BUCKETS, ("method", "route"))
+request_db_time = Counter("http_request_db_seconds_total", "Time spent in SQL statements by route.",
+                          ("method", "route"))
+db_statements = Counter("db_statements_total", "SQL statements executed, in or out of a request.")
+db_latency = Histogram("db_statement_duration_seconds", "SQL statement latency.", LATENCY_BUCKETS)
+
+# name -> TTLCache; their own hit/miss counters are read at scrape time
+_caches = {}
+
+
+def register_cache(name: str, cache):
+    _caches[name] = cache
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+# The stats of the request being served; SQLAlchemy's greenlets carry the context into run_sync.
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # statements don't nest on a connection, so one slot is enough (and a failed one leaves nothing behind)
+    conn.info["metrics_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_started"]
+    db_statements.inc()
+    db_latency.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine):
+    """Count and time every statement run on a (sync) engine; safe to call twice for the same engine."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: latency, status and SQL statements per route template."""
+
+    def __init__(self, app):
+        self.app = app
+        self._templates = {}
+
+    def _route(self, scope) -> str:
+        # the router stores the matched endpoint in the scope; map it back to its path template
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        template = self._templates.get(endpoint)
+        if template is None:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    template = route.path
+                    break
+            self._templates[endpoint] = template = template or "unmatched"
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            labels = (scope["method"], self._route(scope))
+            http_requests.inc(labels + (status,))
+            http_latency.observe(elapsed, labels)
+            request_statements.observe(stats.statements, labels)
+            request_db_time.inc(labels, stats.db_seconds)
+
+
+def render() -> str:
+    lines = []
+    for metric in (http_requests, http_latency, request_statements, request_db_time, db_statements, db_latency):
+        lines.extend(metric.render())
+
+    lines.append("# HELP cache_hits_total Cache lookups that found a live entry.")
+    lines.append("# TYPE cache_hits_total counter")
+    lines.extend(f'cache_hits_total{{cache="{name}"}} {cache.hits}' for name, cache in _caches.items())
+    lines.append("# HELP cache_misses_total Cache lookups that found nothing or an expired entry.")
+    lines.append("# TYPE cache_misses_total counter")
+    lines.extend(f'cache_misses_total{{cache="{name}"}} {cache.misses}' for name, cache in _caches.items())
+    lines.append("# HELP cache_entries Entries currently held by a cache.")
+    lines.append("# TYPE cache_entries gauge")
+    lines.extend(f'cache_entries{{cache="{name}"}} {len(cache)}' for name, cache in _caches.items())
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Boolean, Float, TIMESTAMP, text, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, Float, TIMESTAMP, text, ForeignKey, DateTime, func, Index
+from sqlalchemy import DDL, MetaData, Table, event
 from .database import Base
 
 
@@ -26,9 +27,85 @@ class Announcement(Base):
     rooms_count = Column(Integer)
     description = Column(String)
     created_at = Column(DateTime, default=func.now())
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
 
     user_id = Column(ForeignKey('users.id'))
     total_comments = Column(Integer, default=0)
+    # Bumped on every change to the row; the ETag of GET /shanyraks/{id} is built from it.
+    version = Column(Integer, nullable=False, default=1, server_default=text('1'))
+
+    # One index per filter combination /shanyraks/search can build:
+    # equality columns first, the price range last.
+    __table_args__ = (
+        Index('ix_announcements_type_rooms_count_price', 'type', 'rooms_count', 'price'),
+        Index('ix_announcements_type_price', 'type', 'price'),
+        Index('ix_announcements_rooms_count_price', 'rooms_count', 'price'),
+        Index('ix_announcements_price', 'price'),
+    )
+
+
+# External-content FTS5 index over announcements.description/address, kept in sync by triggers.
+# It lives outside Base.metadata: create_all can't emit CREATE VIRTUAL TABLE, so the DDL below
+# runs after the announcements table is created (and in the matching Alembic revision).
+ANNOUNCEMENTS_FTS_DDL = [
+    """CREATE VIRTUAL TABLE announcements_fts USING fts5(
+        description, address, content='announcements', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER announcements_fts_ai AFTER INSERT ON announcements BEGIN
+        INSERT INTO announcements_fts(rowid, description, address) VALUES (new.id, new.description, new.address);
+    END""",
+    """CREATE TRIGGER announcements_fts_ad AFTER DELETE ON announcements BEGIN
+        INSERT INTO announcements_fts(announcements_fts, rowid, description, address)
+        VALUES ('delete', old.id, old.description, old.address);
+    END""",
+    """CREATE TRIGGER announcements_fts_au AFTER UPDATE OF description, address ON announcements BEGIN
+        INSERT INTO announcements_fts(announcements_fts, rowid, description, address)
+        VALUES ('delete', old.id, old.description, old.address);
+        INSERT INTO announcements_fts(rowid, description, address) VALUES (new.id, new.description, new.address);
+    END""",
+]
+
+for statement in ANNOUNCEMENTS_FTS_DDL:
+    event.listen(Announcement.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+announcements_fts = Table(
+    'announcements_fts', MetaData(),
+    Column('rowid', Integer, primary_key=True),
+    Column('description', String),
+    Column('address', String),
+)
+
+
+# R*Tree over (latitude, longitude) for map queries; rows without coordinates are left out.
+# Like the FTS index it is created next to the announcements table and maintained by triggers.
+ANNOUNCEMENTS_RTREE_DDL = [
+    "CREATE VIRTUAL TABLE announcements_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    """CREATE TRIGGER announcements_rtree_ai AFTER INSERT ON announcements
+    WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO announcements_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    """CREATE TRIGGER announcements_rtree_ad AFTER DELETE ON announcements BEGIN
+        DELETE FROM announcements_rtree WHERE id = old.id;
+    END""",
+    """CREATE TRIGGER announcements_rtree_au AFTER UPDATE OF latitude, longitude ON announcements BEGIN
+        DELETE FROM announcements_rtree WHERE id = old.id;
+        INSERT INTO announcements_rtree SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END""",
+]
+
+for statement in ANNOUNCEMENTS_RTREE_DDL:
+    event.listen(Announcement.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+announcements_rtree = Table(
+    'announcements_rtree', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('min_lat', Float),
+    Column('max_lat', Float),
+    Column('min_lng', Float),
+    Column('max_lng', Float),
+)
 
 
 class Comment(Base):
@@ -40,6 +117,28 @@ class Comment(Base):
     announcement_id = Column(ForeignKey('announcements.id'))
     created_at = Column(TIMESTAMP, default=datetime.now().replace(second=0, microsecond=0))
 
+    # serves both the per-announcement listing and its id-ordered cursor
+    __table_args__ = (
+        Index('ix_comments_announcement_id_id', 'announcement_id', 'id'),
+    )
+
+
+# announcements.total_comments is maintained here, so every insert or delete path keeps it
+# exact without a COUNT(*). A change in the count also changes the row's version (see GET /shanyraks/{id}).
+COMMENTS_COUNTER_DDL = [
+    """CREATE TRIGGER comments_total_ai AFTER INSERT ON comments BEGIN
+        UPDATE announcements SET total_comments = coalesce(total_comments, 0) + 1, version = version + 1
+        WHERE id = new.announcement_id;
+    END""",
+    """CREATE TRIGGER comments_total_ad AFTER DELETE ON comments BEGIN
+        UPDATE announcements SET total_comments = max(coalesce(total_comments, 0) - 1, 0), version = version + 1
+        WHERE id = old.announcement_id;
+    END""",
+]
+
+for statement in COMMENTS_COUNTER_DDL:
+    event.listen(Comment.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
 
 class UserFavorite(Base):
     __tablename__ = 'user_favorites'
@@ -48,5 +147,10 @@ class UserFavorite(Base):
     user_id = Column(ForeignKey('users.id'))
     announcement_id = Column(ForeignKey('announcements.id'))
 
+    # one favorite per (user, announcement); also the access path of the favorites listing
+    __table_args__ = (
+        Index('ix_user_favorites_user_id_announcement_id', 'user_id', 'announcement_id', unique=True),
+    )
+
 
 
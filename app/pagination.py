@@ -0,0 +1,73 @@
+import base64
+import json
+import math
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import String, and_, literal, or_, tuple_
+
+from . import models
+
+
+SORT_KEYS = {
+    "id": models.Announcement.id,
+    "price": models.Announcement.price,
+    "created_at": models.Announcement.created_at,
+}
+
+# "estimate" never counts more rows than this, so its cost is bounded on big tables
+ESTIMATE_COUNT_CAP = 1000
+
+
+def encode_cursor(sort: str, row) -> str:
+    value = getattr(row, sort)
+    if isinstance(value, datetime):
+        # SQLite keeps datetimes as text; match the format the row was stored in
+        # (CURRENT_TIMESTAMP has no fraction) so the seek compares like ORDER BY does.
+        value = value.strftime("%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S")
+    raw = json.dumps([sort, value, row.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        # the value is bound straight into the seek, so it must have the sort key's type
+        if cursor_sort == "created_at":
+            if value is not None:
+                datetime.fromisoformat(value)
+                value = literal(value, String)
+        elif cursor_sort == "price":
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                      or math.isnan(value)):
+                raise TypeError(value)
+        elif cursor_sort in ("id", "announcement_id") and (isinstance(value, bool) or not isinstance(value, int)):
+            raise TypeError(value)
+        last_id = int(last_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if cursor_sort != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match the sort order")
+    return value, last_id
+
+
+def seek(query, sort: str, cursor: str = None):
+    """Order by (sort key, id) and skip everything up to the cursor with a WHERE clause."""
+    column = SORT_KEYS[sort]
+    if sort == "id":
+        if cursor:
+            _, last_id = decode_cursor(cursor, sort)
+            query = query.filter(models.Announcement.id > last_id)
+        return query.order_by(models.Announcement.id)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        if value is None:
+            # NULLs sort first, and a row-value comparison with NULL matches nothing
+            query = query.filter(or_(and_(column.is_(None), models.Announcement.id > last_id),
+                                     column.is_not(None)))
+        else:
+            query = query.filter(tuple_(column, models.Announcement.id) > tuple_(value, last_id))
+    return query.order_by(column, models.Announcement.id)
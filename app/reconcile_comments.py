@@ -0,0 +1,60 @@
+"""Re-derive announcements.total_comments from the comments table.
+
+The counter is kept up to date by triggers; this job repairs rows written before
+they existed (or by anything that bypassed them). It walks announcement ids in
+chunks, one short transaction per chunk, so it can run against a live database.
+
+    python -m app.reconcile_comments --chunk-size 5000
+"""
+import argparse
+import time
+
+from sqlalchemy import func, select, text
+
+from . import database, models
+
+SET_COUNTS = text("""
+    UPDATE announcements SET total_comments = counts.n, version = version + 1
+    FROM (
+        SELECT announcement_id, count(*) AS n FROM comments
+        WHERE announcement_id >= :low AND announcement_id < :high
+        GROUP BY announcement_id
+    ) AS counts
+    WHERE announcements.id = counts.announcement_id AND announcements.total_comments IS NOT counts.n
+""")
+
+SET_ZERO = text("""
+    UPDATE announcements SET total_comments = 0, version = version + 1
+    WHERE id >= :low AND id < :high AND total_comments IS NOT 0
+      AND id NOT IN (SELECT announcement_id FROM comments WHERE announcement_id >= :low AND announcement_id < :high)
+""")
+
+
+def reconcile(engine=None, chunk_size: int = 5000) -> int:
+    engine = engine or database.engine
+    with engine.connect() as conn:
+        first, last = conn.execute(select(func.min(models.Announcement.id), func.max(models.Announcement.id))).one()
+    if first is None:
+        return 0
+
+    fixed = 0
+    for low in range(first, last + 1, chunk_size):
+        bounds = {"low": low, "high": low + chunk_size}
+        with engine.begin() as conn:
+            fixed += conn.execute(SET_COUNTS, bounds).rowcount
+            fixed += conn.execute(SET_ZERO, bounds).rowcount
+    return fixed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    fixed = reconcile(chunk_size=args.chunk_size)
+    print(f"corrected {fixed} announcements in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
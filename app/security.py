@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import functools
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from .cache import token_cache
+
+logger = logging.getLogger(__name__)
+
+JWT_ALGORITHM = "HS256"
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", "3600"))
+
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+if not JWT_SECRET_KEY:
+    # Tokens signed with a per-process key stop working on restart and across workers.
+    logger.warning("JWT_SECRET_KEY is not set; using a random key for this process")
+    JWT_SECRET_KEY = secrets.token_urlsafe(32)
+
+
+def create_access_token(user_id: int) -> str:
+    """Sign a token for user_id: the subject plus iat/exp, nothing that can go stale."""
+    now = int(time.time())
+    claims = {"sub": str(user_id), "iat": now, "exp": now + ACCESS_TOKEN_TTL}
+    return jwt.encode(claims, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+
+def decode_access_token(token: str) -> int:
+    """Return the user id of a valid token, 401 otherwise.
+
+    Verified tokens are remembered with their expiry, so a client reusing its token
+    skips the HMAC check and JSON decoding; the expiry is still checked on every hit.
+    """
+    cached = token_cache.get(token)
+    if cached is not None:
+        user_id, expires_at = cached
+        if expires_at > time.time():
+            return user_id
+        token_cache.invalidate(token)
+
+    try:
+        claims = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM], options={"require_exp": True})
+        user_id = int(claims["sub"])
+    except (JWTError, KeyError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+    token_cache.set(token, (user_id, claims["exp"]))
+    return user_id
+
+
+# Shared secret for the /admin endpoints, sent as X-Admin-Token; unset disables them.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def check_admin_token(token: str) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+# scrypt work factor: N = 2 ** PASSWORD_HASH_COST, with r=8 and p=1 each hash takes 128 * N * 8 bytes
+# of memory (32 MiB at the default). Tune with benchmarks/login.py.
+PASSWORD_HASH_COST = int(os.getenv("PASSWORD_HASH_COST", "15"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# hashlib.scrypt releases the GIL, so a thread pool hashes in parallel. Its own bounded pool keeps
+# logins from starving the default executor that run_sync and friends share.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, cost: int, r: int, p: int) -> bytes:
+    n = 2 ** cost
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=129 * n * r * p + 1024 * 1024,
+                          dklen=32)
+
+
+def hash_password_sync(password: str, cost: int = None) -> str:
+    """Return "scrypt$<cost>$<r>$<p>$<salt>$<hash>" for password."""
+    cost = PASSWORD_HASH_COST if cost is None else cost
+    salt = secrets.token_bytes(16)
+    digest = _scrypt(password, salt, cost, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${cost}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password_sync(password: str, stored: str) -> bool:
+    if not stored:
+        return False
+    if not stored.startswith("scrypt$"):
+        # a row from before hashing: the column still holds the plaintext
+        return hmac.compare_digest(password.encode(), stored.encode())
+    _, cost, r, p, salt, digest = stored.split("$")
+    return hmac.compare_digest(_scrypt(password, _unb64(salt), int(cost), int(r), int(p)), _unb64(digest))
+
+
+def needs_rehash(stored: str) -> bool:
+    """True for plaintext rows and hashes made with other parameters than the current ones."""
+    return not stored.startswith(f"scrypt${PASSWORD_HASH_COST}${SCRYPT_R}${SCRYPT_P}$")
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, hash_password_sync, password)
+
+
+# Logins for unknown users are checked against this, so they take as long as real ones.
+# Computed on first use (or by prewarm_password_hashing), not at import: it is a full scrypt run.
+@functools.lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    return hash_password_sync(secrets.token_urlsafe(16))
+
+
+def _verify_or_dummy(password: str, stored: str = None) -> bool:
+    return verify_password_sync(password, stored if stored is not None else _dummy_hash())
+
+
+async def verify_password(password: str, stored: str = None) -> bool:
+    """Check password against a stored hash (or legacy plaintext); with no stored value, against a dummy."""
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, _verify_or_dummy, password, stored)
+
+
+async def prewarm_password_hashing():
+    """Start a hashing thread and compute the dummy hash before the first login needs them."""
+    await asyncio.get_running_loop().run_in_executor(_hash_executor, _dummy_hash)
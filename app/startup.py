@@ -0,0 +1,180 @@
+"""Startup without side effects at import time.
+
+The lifespan hook checks that the database is at the Alembic head (migrations are run by
+``python -m app.startup`` before the workers start), creates the schema only when
+DATABASE_CREATE_SCHEMA is set and the database is empty, and prewarms the
+connection pools and SQLAlchemy's compiled-statement cache so the first requests don't pay
+for connecting, pragmas and query compilation.
+"""
+import ast
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import configure_mappers
+
+from . import database, models  # noqa: F401 -- models registers the tables on Base.metadata
+from .announcements_repository import AnnouncementRepository
+from .comments_repository import CommentRepository
+from .favorites_repository import FavoriteRepository
+from .security import prewarm_password_hashing
+from .user_repository import UsersRepository
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_DIR = os.path.join(ROOT_DIR, "alembic")
+
+# "strict" refuses to start on a mismatch, "warn" logs it, "off" skips the check.
+SCHEMA_CHECK = os.getenv("DATABASE_SCHEMA_CHECK", "warn")
+CREATE_SCHEMA = os.getenv("DATABASE_CREATE_SCHEMA", "0") == "1"
+PREWARM = os.getenv("DATABASE_PREWARM", "1") == "1"
+
+
+def alembic_heads() -> set:
+    """Revisions that no other revision builds on, read from the version files' ``revision`` and
+    ``down_revision`` assignments; importing alembic alone costs more than the whole check."""
+    revisions, parents = set(), set()
+    versions = os.path.join(ALEMBIC_DIR, "versions")
+    for name in os.listdir(versions):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(versions, name)) as file:
+            module = ast.parse(file.read())
+        for node in module.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1:
+                target = node.targets[0]
+            elif isinstance(node, ast.AnnAssign) and node.value is not None:
+                target = node.target
+            else:
+                continue
+            # other module-level assignments can be any expression; only these two are literals
+            if not isinstance(target, ast.Name) or target.id not in ("revision", "down_revision"):
+                continue
+            value = ast.literal_eval(node.value)
+            if target.id == "revision":
+                revisions.add(value)
+            elif target.id == "down_revision" and value:
+                parents.update([value] if isinstance(value, str) else value)
+    return revisions - parents
+
+
+def _current_heads(connection) -> set:
+    if not inspect(connection).has_table("alembic_version"):
+        return set()
+    return set(connection.execute(text("SELECT version_num FROM alembic_version")).scalars())
+
+
+def _has_tables(connection) -> bool:
+    return bool(set(inspect(connection).get_table_names()) - {"alembic_version"})
+
+
+def _create_schema(connection, heads: set):
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    # create_all skips existing tables, so stamping a pre-Alembic database would leave it without
+    # everything the migrations add
+    if _has_tables(connection):
+        raise RuntimeError("DATABASE_CREATE_SCHEMA is set but the database already has tables and no "
+                           "Alembic revision; stamp the revision its schema matches and run "
+                           "`alembic upgrade head`")
+    database.Base.metadata.create_all(connection)
+    MigrationContext.configure(connection).stamp(ScriptDirectory(ALEMBIC_DIR), tuple(heads))
+
+
+async def check_schema():
+    heads = alembic_heads()
+    async with database.async_read_engine.connect() as connection:
+        current = await connection.run_sync(_current_heads)
+
+    if not current and CREATE_SCHEMA:
+        logger.info("creating the schema at %s", ", ".join(sorted(heads)))
+        async with database.async_engine.begin() as connection:
+            await connection.run_sync(_create_schema, heads)
+        return
+
+    if current != heads and SCHEMA_CHECK != "off":
+        message = (f"database is at {', '.join(sorted(current)) or 'no revision'}, code expects "
+                   f"{', '.join(sorted(heads))}; run `alembic upgrade head` "
+                   f"(or set DATABASE_CREATE_SCHEMA=1 for a new database)")
+        if SCHEMA_CHECK == "strict":
+            raise RuntimeError(message)
+        logger.warning(message)
+
+
+async def prewarm():
+    """Open every pooled connection and run the hot read queries once against nonexistent ids."""
+    configure_mappers()
+
+    # check out as many connections as each pool holds at once, so all of them get opened
+    for engine in {database.async_engine, database.async_read_engine}:
+        connections = [await engine.connect() for _ in range(engine.pool.size())]
+        for connection in connections:
+            await connection.close()
+
+    def warm(session):
+        UsersRepository.get_user_by_id(session, 0)
+        UsersRepository.get_user_by_email(session, "")
+        UsersRepository.get_user_by_phone(session, "")
+        AnnouncementRepository.get_announcement_by_id(session, 0)
+        AnnouncementRepository.get_announcements_by_ids(session, [0])
+        AnnouncementRepository.search_announcements(session, limit=5, offset=1)
+        AnnouncementRepository.search_announcements(session, limit=5, offset=1, pagination="cursor", total="none")
+        FavoriteRepository.get_all_favorites(0, session)
+        try:
+            CommentRepository.get_announcement_comments(0, session)
+        except HTTPException:
+            pass
+
+    async with database.AsyncReadSessionLocal() as session:
+        await session.run_sync(warm)
+    await prewarm_password_hashing()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    started = time.perf_counter()
+    await check_schema()
+    if PREWARM:
+        try:
+            await prewarm()
+        except Exception:
+            # only an optimization: a schema the check merely warned about can still fail here
+            logger.warning("prewarm failed", exc_info=True)
+    logger.info("startup finished in %.1f ms", (time.perf_counter() - started) * 1000)
+    yield
+    await database.async_engine.dispose()
+    await database.async_read_engine.dispose()
+    await database.async_export_engine.dispose()
+
+
+def migrate():
+    """Bring the database to the Alembic head; scripts/launch.sh runs this before the workers start.
+
+    The first migration alters tables it doesn't create, so an empty database is created from the
+    models and stamped instead, when DATABASE_CREATE_SCHEMA is set.
+    """
+    with database.engine.begin() as connection:
+        empty = not _current_heads(connection) and not _has_tables(connection)
+        if empty and CREATE_SCHEMA:
+            logger.info("creating the schema")
+            _create_schema(connection, alembic_heads())
+            return
+    if empty:
+        raise SystemExit("the database is empty; set DATABASE_CREATE_SCHEMA=1 to create it")
+
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(ROOT_DIR, "alembic.ini"))
+    config.set_main_option("script_location", ALEMBIC_DIR)
+    command.upgrade(config, "head")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    migrate()
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field, EmailStr
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from . import models
+from .cache import user_cache
 
 from sqlalchemy import update
 
@@ -18,7 +20,6 @@ class UserResponse(BaseModel):
     email: EmailStr
     name: str
     phone: str
-    password: str = Field(min_length=8)
     city: str
 
 class UserUpdate(BaseModel):
@@ -53,18 +54,56 @@ class UsersRepository:
         return db_user
 
     @staticmethod
-    def updated_user(db: Session, user, user_update: UserUpdate):
-        db_user_update = update(models.User).where(models.User.email == user.email).values(phone=user_update.phone, name=user_update.name, city=user_update.city)
+    def updated_user(db: Session, user_id, user_update: UserUpdate):
+        db_user_update = update(models.User).where(models.User.id == user_id).values(phone=user_update.phone, name=user_update.name, city=user_update.city)
 
 
         db.execute(db_user_update)
         db.commit()
+        user_cache.invalidate(user_id)
 
 
 
 
+    @staticmethod
+    def update_password(db: Session, user_id, password_hash: str):
+        db.execute(update(models.User).where(models.User.id == user_id).values(password=password_hash))
+        db.commit()
+
     @staticmethod
     def get_all_users(db: Session):
         return db.query(models.User).all()
 
 
+class AsyncUsersRepository:
+    @staticmethod
+    async def get_user_by_username(db: AsyncSession, name):
+        return await db.run_sync(UsersRepository.get_user_by_username, name)
+
+    @staticmethod
+    async def get_user_by_id(db: AsyncSession, user_id):
+        return await db.run_sync(UsersRepository.get_user_by_id, user_id)
+
+    @staticmethod
+    async def get_user_by_phone(db: AsyncSession, user_phone):
+        return await db.run_sync(UsersRepository.get_user_by_phone, user_phone)
+
+    @staticmethod
+    async def get_user_by_email(db: AsyncSession, user_email):
+        return await db.run_sync(UsersRepository.get_user_by_email, user_email)
+
+    @staticmethod
+    async def create_user(db: AsyncSession, user: UserRequest) -> models.User:
+        return await db.run_sync(UsersRepository.create_user, user)
+
+    @staticmethod
+    async def updated_user(db: AsyncSession, user_id, user_update: UserUpdate):
+        return await db.run_sync(UsersRepository.updated_user, user_id, user_update)
+
+    @staticmethod
+    async def update_password(db: AsyncSession, user_id, password_hash: str):
+        return await db.run_sync(UsersRepository.update_password, user_id, password_hash)
+
+    @staticmethod
+    async def get_all_users(db: AsyncSession):
+        return await db.run_sync(UsersRepository.get_all_users)
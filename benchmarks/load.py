@@ -0,0 +1,345 @@
+"""Drive every route of app.main in process and report latency percentiles and throughput per route.
+
+    python -m benchmarks.seed --db /tmp/shanyraq-bench.db
+    python -m benchmarks.load --db /tmp/shanyraq-bench.db --requests 200 --concurrency 16 \\
+        --output results.json [--baseline baseline.json --tolerance 0.2]
+
+Routes run one after another, each with --requests calls at most --concurrency at a time, through
+httpx's ASGI transport (no sockets). Write routes change the database, so re-seed a fresh file
+for runs that are meant to be compared. With --baseline, any route whose p95 grew or whose
+requests/s dropped by more than --tolerance is reported and the exit status is 1.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import re
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Context:
+    users: int
+    announcements: int
+    sessions: list = field(default_factory=list)  # (user_id, auth headers) of logged-in seeded users
+    created: list = field(default_factory=list)  # (headers, announcement_id) made by "create announcement"
+    comments: list = field(default_factory=list)  # (headers, announcement_id, comment_id)
+    favorites: list = field(default_factory=list)  # (headers, favorite_id) seen by "list favorites"
+    counter: itertools.count = field(default_factory=itertools.count)
+
+
+def _announcement_body(rng):
+    return {"type": rng.choice(["sell", "rent"]), "price": float(rng.randint(50, 900) * 1000),
+            "address": f"Abay {rng.randint(1, 300)}, Almaty", "area": 54.0, "rooms_count": rng.randint(1, 4),
+            "description": "bright quiet flat near the metro", "latitude": 43.24, "longitude": 76.89}
+
+
+def _random_id(ctx, rng):
+    return rng.randint(1, ctx.announcements)
+
+
+def _session(ctx, rng):
+    return rng.choice(ctx.sessions)[1]
+
+
+async def register(client, ctx, rng):
+    n = next(ctx.counter)
+    return await client.post("/auth/users/", json={
+        "email": f"load-{uuid.uuid4().hex[:12]}@example.com", "name": f"Load {n}",
+        "phone": f"+7{uuid.uuid4().int % 10 ** 12:012d}", "password": "load-password", "city": "Almaty"})
+
+
+async def login(client, ctx, rng):
+    from benchmarks.seed import SEED_PASSWORD, user_email
+    return await client.post("/auth/users/login",
+                             data={"username": user_email(rng.randint(1, ctx.users)), "password": SEED_PASSWORD})
+
+
+async def get_profile(client, ctx, rng):
+    return await client.get("/auth/users/me", headers=_session(ctx, rng))
+
+
+async def update_profile(client, ctx, rng):
+    user_id, headers = rng.choice(ctx.sessions)
+    return await client.patch("/auth/users/me", headers=headers,
+                              json={"phone": f"+7700{user_id:07d}", "name": f"User {user_id}", "city": "Almaty"})
+
+
+async def get_by_ids(client, ctx, rng):
+    ids = ",".join(str(_random_id(ctx, rng)) for _ in range(20))
+    return await client.get("/shanyraks", params={"ids": ids})
+
+
+async def search_filters(client, ctx, rng):
+    low = rng.randint(10, 80) * 1_000_000
+    return await client.get("/shanyraks/search", params={
+        "type": "sell", "rooms_count": rng.randint(1, 4), "price_from": low, "price_until": low + 5_000_000,
+        "limit": 20, "offset": rng.randint(1, 5)})
+
+
+async def search_cursor(client, ctx, rng):
+    return await client.get("/shanyraks/search", params={
+        "type": rng.choice(["sell", "rent"]), "pagination": "cursor", "sort": "price", "total": "none", "limit": 20})
+
+
+async def search_text(client, ctx, rng):
+    return await client.get("/shanyraks/search", params={"q": " ".join(rng.sample(["balcony", "metro", "park", "quiet",
+                                                                                    "view"], 2)),
+                                                         "total": "estimate", "limit": 20})
+
+
+async def search_geo(client, ctx, rng):
+    return await client.get("/shanyraks/search", params={
+        "lat": 43.238 + rng.uniform(-0.1, 0.1), "lng": 76.889 + rng.uniform(-0.1, 0.1), "radius_km": 2,
+        "total": "none", "limit": 20, "fields": "id,price,latitude,longitude"})
+
+
+async def export(client, ctx, rng):
+    low = rng.randint(10, 80) * 1_000_000
+    return await client.get("/shanyraks/export", params={
+        "type": "sell", "rooms_count": rng.randint(1, 4), "price_from": low, "price_until": low + 1_000_000})
+
+
+async def get_announcement(client, ctx, rng):
+    return await client.get(f"/shanyraks/{_random_id(ctx, rng)}")
+
+
+async def create_announcement(client, ctx, rng):
+    headers = _session(ctx, rng)
+    response = await client.post("/shanyraks/", headers=headers, json=_announcement_body(rng))
+    if response.status_code == 200:
+        ctx.created.append((headers, response.json()["id"]))
+    return response
+
+
+async def import_announcements(client, ctx, rng):
+    body = "\n".join(json.dumps(_announcement_body(rng)) for _ in range(50))
+    return await client.post("/shanyraks/import", headers=_session(ctx, rng), content=body.encode())
+
+
+async def update_announcement(client, ctx, rng):
+    headers, announcement_id = rng.choice(ctx.created)
+    return await client.patch(f"/shanyraks/{announcement_id}", headers=headers, json=_announcement_body(rng))
+
+
+async def create_comment(client, ctx, rng):
+    headers = _session(ctx, rng)
+    announcement_id = _random_id(ctx, rng)
+    response = await client.post(f"/shanyraks/{announcement_id}/comments", params={"id_announcement": announcement_id},
+                                 headers=headers, json={"content": "is it still available?"})
+    if response.status_code == 200:
+        ctx.comments.append((headers, announcement_id, response.json()["id"]))
+    return response
+
+
+async def get_comments(client, ctx, rng):
+    announcement_id = _random_id(ctx, rng)
+    return await client.get(f"/shanyraks/{announcement_id}/comments", params={"id_announcement": announcement_id})
+
+
+async def update_comment(client, ctx, rng):
+    headers, announcement_id, comment_id = rng.choice(ctx.comments)
+    return await client.patch(f"/shanyraks/{announcement_id}/comments/{comment_id}",
+                              params={"id_announcement": announcement_id, "comment_id": comment_id},
+                              headers=headers, json={"content": "updated"})
+
+
+async def delete_comment(client, ctx, rng):
+    if not ctx.comments:
+        return None
+    headers, announcement_id, comment_id = ctx.comments.pop()
+    return await client.delete(f"/shanyraks/{announcement_id}/comments/{comment_id}",
+                               params={"id_announcement": announcement_id, "comment_id": comment_id}, headers=headers)
+
+
+async def add_favorite(client, ctx, rng):
+    return await client.post(f"/auth/users/favorites/shanyraks/{_random_id(ctx, rng)}", headers=_session(ctx, rng))
+
+
+async def update_favorites(client, ctx, rng):
+    return await client.patch("/auth/users/favorites/shanyraks", headers=_session(ctx, rng), json={
+        "add": [_random_id(ctx, rng) for _ in range(5)], "remove": [_random_id(ctx, rng) for _ in range(5)]})
+
+
+async def list_favorites(client, ctx, rng):
+    headers = _session(ctx, rng)
+    response = await client.get("/auth/users/favorites/shanyraks", headers=headers)
+    if response.status_code == 200:
+        ctx.favorites.extend((headers, favorite["id"]) for favorite in response.json())
+    return response
+
+
+async def delete_favorite(client, ctx, rng):
+    if not ctx.favorites:
+        return None
+    headers, favorite_id = ctx.favorites.pop()
+    return await client.delete(f"/auth/users/favorites/shanyraks/{favorite_id}",
+                               params={"favorite_id": favorite_id}, headers=headers)
+
+
+async def delete_announcement(client, ctx, rng):
+    if not ctx.created:
+        return None
+    headers, announcement_id = ctx.created.pop()
+    return await client.delete(f"/shanyraks/{announcement_id}", headers=headers)
+
+
+# In run order: later routes use what earlier ones created.
+ROUTES = [
+    ("POST /auth/users/", register),
+    ("POST /auth/users/login", login),
+    ("GET /auth/users/me", get_profile),
+    ("PATCH /auth/users/me", update_profile),
+    ("GET /shanyraks", get_by_ids),
+    ("GET /shanyraks/search [filters]", search_filters),
+    ("GET /shanyraks/search [cursor]", search_cursor),
+    ("GET /shanyraks/search [q]", search_text),
+    ("GET /shanyraks/search [geo]", search_geo),
+    ("GET /shanyraks/export", export),
+    ("GET /shanyraks/{id}", get_announcement),
+    ("POST /shanyraks/", create_announcement),
+    ("POST /shanyraks/import", import_announcements),
+    ("PATCH /shanyraks/{id}", update_announcement),
+    ("POST /shanyraks/{id}/comments", create_comment),
+    ("GET /shanyraks/{id}/comments", get_comments),
+    ("PATCH /shanyraks/{id}/comments/{comment_id}", update_comment),
+    ("DELETE /shanyraks/{id}/comments/{comment_id}", delete_comment),
+    ("POST /auth/users/favorites/shanyraks/{id}", add_favorite),
+    ("PATCH /auth/users/favorites/shanyraks", update_favorites),
+    ("GET /auth/users/favorites/shanyraks", list_favorites),
+    ("DELETE /auth/users/favorites/shanyraks/{id}", delete_favorite),
+    ("DELETE /shanyraks/{id}", delete_announcement),
+]
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of a sorted list."""
+    return samples[max(0, math.ceil(p / 100 * len(samples)) - 1)]
+
+
+async def drive(client, ctx, scenario, requests, concurrency, seed):
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    samples, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await scenario(client, ctx, rng)
+            elapsed = (time.perf_counter() - started) * 1000
+            if response is None:  # nothing left to act on
+                return
+            samples.append(elapsed)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - started
+
+    samples.sort()
+    if not samples:
+        return None
+    return {
+        "requests": len(samples), "errors": errors, "rps": round(len(samples) / wall, 1),
+        "p50_ms": round(percentile(samples, 50), 3), "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3), "max_ms": round(samples[-1], 3),
+    }
+
+
+async def run(args, ctx):
+    import httpx
+
+    from benchmarks.seed import SEED_PASSWORD, user_email
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for user_id in range(1, min(args.sessions, ctx.users) + 1):
+            response = await client.post("/auth/users/login",
+                                         data={"username": user_email(user_id), "password": SEED_PASSWORD})
+            response.raise_for_status()
+            ctx.sessions.append((user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}))
+
+        results = {}
+        for index, (name, scenario) in enumerate(ROUTES):
+            if args.routes and not re.search(args.routes, name):
+                continue
+            result = await drive(client, ctx, scenario, args.requests, args.concurrency, args.seed + index)
+            if result is None:
+                continue
+            results[name] = result
+            print(f"{name:<46} {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}"
+                  f"  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}")
+        return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a line per route that regressed against baseline beyond tolerance."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        if result["rps"] < before["rps"] / (1 + tolerance):
+            regressions.append(f"{name}: {before['rps']:.1f} -> {result['rps']:.1f} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="a database made by benchmarks.seed")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sessions", type=int, default=8, help="seeded users to log in and act as")
+    parser.add_argument("--routes", help="only run routes whose name matches this regex")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.db)
+    if not os.path.exists(path):
+        parser.error(f"{args.db} does not exist; create it with python -m benchmarks.seed")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    import sqlite3
+    with sqlite3.connect(path) as conn:
+        users, announcements = (conn.execute(f"SELECT max(id) FROM {table}").fetchone()[0] or 0
+                                for table in ("users", "announcements"))
+    ctx = Context(users=users, announcements=announcements)
+
+    results = asyncio.run(run(args, ctx))
+    report = {
+        "meta": {"db": path, "users": users, "announcements": announcements, "requests": args.requests,
+                 "concurrency": args.concurrency, "python": platform.python_version(),
+                 "started_at": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "routes": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline)["routes"], args.tolerance)
+        for line in regressions:
+            print("REGRESSION " + line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Login throughput per password-hash cost, with concurrent clients against the in-process app.
+
+    python -m benchmarks.login --costs 12,14,15,16 --requests 200 --concurrency 16
+
+PASSWORD_HASH_WORKERS sets the size of the hashing pool, as in production.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+async def run(args):
+    import httpx
+
+    from app import security
+    from app.main import app
+
+    credentials = {"username": "bench@example.com", "password": "benchmark-password"}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/auth/users/", json={
+            "email": credentials["username"], "name": "Bench", "phone": "+70000000000",
+            "password": credentials["password"], "city": "Almaty",
+        })
+        assert response.status_code == 200, response.text
+
+        print(f"hash pool: {security.PASSWORD_HASH_WORKERS} workers, concurrency {args.concurrency}")
+        for cost in args.costs:
+            security.PASSWORD_HASH_COST = cost
+            # the first login rehashes the stored password to this cost
+            assert (await client.post("/auth/users/login", data=credentials)).status_code == 200
+
+            semaphore = asyncio.Semaphore(args.concurrency)
+            samples = []
+
+            async def login():
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post("/auth/users/login", data=credentials)
+                    samples.append((time.perf_counter() - started) * 1000)
+                    assert response.status_code == 200, response.text
+
+            started = time.perf_counter()
+            await asyncio.gather(*(login() for _ in range(args.requests)))
+            elapsed = time.perf_counter() - started
+
+            samples.sort()
+            print(f"cost {cost:>2} (N=2^{cost}, {128 * 2 ** cost * security.SCRYPT_R >> 20} MiB): "
+                  f"{args.requests / elapsed:8.1f} logins/s  p50 {statistics.median(samples):7.1f} ms  "
+                  f"p95 {samples[int(len(samples) * 0.95) - 1]:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--costs", type=lambda value: [int(cost) for cost in value.split(",")], default=[12, 14, 15, 16])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="shanyraq-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["DATABASE_CREATE_SCHEMA"] = "1"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Fail when an endpoint runs more SQL statements or loads more ORM rows than its budget.
+
+    python -m benchmarks.query_budget [--report]
+
+Each route of app.main is called once against a freshly seeded scratch database, with every
+in-process cache cleared first, so the cold path is what gets measured. Statements are counted
+with a before_cursor_execute listener on the app's engines; ORM rows with a "load" listener on
+the declarative base. Search is also checked with EXPLAIN QUERY PLAN, as benchmarks.search_plans
+does: every combination of filters must be served by the index built for it. Exits 1 on any
+breach; --report prints the measured numbers of every route, e.g. to tighten budgets after a fix.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from benchmarks.search_plans import SEARCH_PLANS, explain_search
+
+# Route name -> (max statements, max ORM rows loaded). Sized for the cold path, with no slack:
+# a new round trip or a row loaded per item should fail here first.
+BUDGETS = {
+    "POST /auth/users/": (3, 1),
+    "POST /auth/users/login": (1, 1),
+    "GET /auth/users/me": (1, 1),
+    "PATCH /auth/users/me": (1, 0),
+    "GET /shanyraks": (1, 20),
+    "GET /shanyraks/search": (2, 20),
+    "GET /shanyraks/search [cursor]": (1, 21),
+    "GET /shanyraks/search [q]": (2, 20),
+    "GET /shanyraks/search [geo]": (2, 20),
+    "GET /shanyraks/search [fields]": (2, 20),
+    "GET /shanyraks/export": (1, 0),
+    "GET /shanyraks/{id}": (1, 1),
+    "POST /shanyraks/": (2, 1),
+    "POST /shanyraks/import": (1, 0),
+    "PATCH /shanyraks/{id}": (1, 1),
+    "PATCH /shanyraks/{id} [not owner]": (2, 0),
+    "POST /shanyraks/{id}/comments": (3, 1),
+    "GET /shanyraks/{id}/comments": (1, 51),
+    "PATCH /shanyraks/{id}/comments/{comment_id}": (1, 1),
+    "DELETE /shanyraks/{id}/comments/{comment_id}": (1, 0),
+    "POST /auth/users/favorites/shanyraks/{id}": (2, 1),
+    "PATCH /auth/users/favorites/shanyraks": (3, 0),
+    "GET /auth/users/favorites/shanyraks": (1, 102),  # favorite + announcement per row, limit + 1 rows
+    "DELETE /auth/users/favorites/shanyraks/{id}": (1, 0),
+    "DELETE /shanyraks/{id}": (1, 0),
+}
+
+class Meter:
+    """Counts statements and loaded ORM rows between reset() calls."""
+
+    def __init__(self):
+        self.statements = []
+        self.rows = 0
+
+    def reset(self):
+        self.statements = []
+        self.rows = 0
+
+    def on_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def on_load(self, target, context):
+        self.rows += 1
+
+
+def checks(ctx):
+    """(name, method, url, request kwargs, expected status) in run order.
+
+    A generator, so later checks see the ids that earlier responses stored in ctx.
+    """
+    owner, other = ctx["owner"], ctx["other"]
+    announcement, commented = ctx["announcement"], ctx["commented"]
+    body = {"type": "sell", "price": 25_000_000.0, "address": "Abay 10, Almaty", "area": 54.0, "rooms_count": 2,
+            "description": "bright quiet flat near the metro", "latitude": 43.24, "longitude": 76.89}
+    ids = ",".join(str(i) for i in range(1, 21))
+    yield "POST /auth/users/", "POST", "/auth/users/", {"json": {
+        "email": "budget@example.com", "name": "Budget", "phone": "+70000000001", "password": "budget-password",
+        "city": "Almaty"}}, 200
+    yield "POST /auth/users/login", "POST", "/auth/users/login", {"data": ctx["credentials"]}, 200
+    yield "GET /auth/users/me", "GET", "/auth/users/me", {"headers": owner}, 200
+    yield "PATCH /auth/users/me", "PATCH", "/auth/users/me", {"headers": owner, "json": {
+        "phone": "+77000000001", "name": "User 1", "city": "Almaty"}}, 200
+    yield "GET /shanyraks", "GET", "/shanyraks", {"params": {"ids": ids}}, 200
+    yield "GET /shanyraks/search", "GET", "/shanyraks/search", {"params": {
+        "type": "sell", "rooms_count": 2, "price_from": 1_000_000, "limit": 20}}, 200
+    yield "GET /shanyraks/search [cursor]", "GET", "/shanyraks/search", {"params": {
+        "type": "sell", "pagination": "cursor", "sort": "price", "total": "none", "limit": 20}}, 200
+    yield "GET /shanyraks/search [q]", "GET", "/shanyraks/search", {"params": {"q": "balcony", "limit": 20}}, 200
+    yield "GET /shanyraks/search [geo]", "GET", "/shanyraks/search", {"params": {
+        "lat": 43.238, "lng": 76.889, "radius_km": 10, "limit": 20}}, 200
+    yield "GET /shanyraks/search [fields]", "GET", "/shanyraks/search", {"params": {
+        "type": "rent", "fields": "id,price", "limit": 20}}, 200
+    yield "GET /shanyraks/export", "GET", "/shanyraks/export", {"params": {
+        "type": "sell", "rooms_count": 2, "price_from": 20_000_000, "price_until": 21_000_000}}, 200
+    yield "GET /shanyraks/{id}", "GET", f"/shanyraks/{announcement}", {}, 200
+    yield "POST /shanyraks/", "POST", "/shanyraks/", {"headers": owner, "json": body}, 200
+    yield "POST /shanyraks/import", "POST", "/shanyraks/import", {
+        "headers": owner, "content": "\n".join(json.dumps(body) for _ in range(20)).encode()}, 200
+    yield "PATCH /shanyraks/{id}", "PATCH", f"/shanyraks/{announcement}", {"headers": owner, "json": body}, 200
+    yield "PATCH /shanyraks/{id} [not owner]", "PATCH", f"/shanyraks/{announcement}", {
+        "headers": other, "json": body}, 403
+    yield "POST /shanyraks/{id}/comments", "POST", f"/shanyraks/{commented}/comments", {
+        "params": {"id_announcement": commented}, "headers": owner, "json": {"content": "still available?"}}, 200
+    yield "GET /shanyraks/{id}/comments", "GET", f"/shanyraks/{commented}/comments", {
+        "params": {"id_announcement": commented}}, 200
+    comment = ctx.get("comment", 0)  # 0 when the create above failed; reported there
+    yield "PATCH /shanyraks/{id}/comments/{comment_id}", "PATCH", f"/shanyraks/{commented}/comments/{comment}", {
+        "params": {"id_announcement": commented, "comment_id": comment}, "headers": owner,
+        "json": {"content": "updated"}}, 200
+    yield "DELETE /shanyraks/{id}/comments/{comment_id}", "DELETE", f"/shanyraks/{commented}/comments/{comment}", {
+        "params": {"id_announcement": commented, "comment_id": comment}, "headers": owner}, 200
+    yield "POST /auth/users/favorites/shanyraks/{id}", "POST", f"/auth/users/favorites/shanyraks/{announcement}", {
+        "headers": owner}, 200
+    yield "PATCH /auth/users/favorites/shanyraks", "PATCH", "/auth/users/favorites/shanyraks", {
+        "headers": owner, "json": {"add": list(range(100, 110)), "remove": list(range(105, 115))}}, 200
+    yield "GET /auth/users/favorites/shanyraks", "GET", "/auth/users/favorites/shanyraks", {"headers": owner}, 200
+    favorite = ctx.get("favorite", 0)
+    yield "DELETE /auth/users/favorites/shanyraks/{id}", "DELETE", f"/auth/users/favorites/shanyraks/{favorite}", {
+        "params": {"favorite_id": favorite}, "headers": owner}, 200
+    yield "DELETE /shanyraks/{id}", "DELETE", f"/shanyraks/{ctx.get('created', 0)}", {"headers": owner}, 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report", action="store_true", help="print every route's numbers, not only breaches")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="shanyraq-budget-"), "budget.db")
+    os.environ["PASSWORD_HASH_COST"] = os.getenv("PASSWORD_HASH_COST", "10")
+
+    from benchmarks.seed import SEED_PASSWORD, seed, user_email
+    seed(path, users=50, announcements=5000, comments=20000, favorites=2000)
+
+    import sqlite3
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app import cache, database
+    from app.announcements_repository import AnnouncementRepository
+    from app.main import app
+
+    meter = Meter()
+    for engine in {database.engine, database.async_engine.sync_engine, database.async_read_engine.sync_engine,
+                   database.async_export_engine.sync_engine}:
+        event.listen(engine, "before_cursor_execute", meter.on_statement)
+    event.listen(database.Base, "load", meter.on_load, propagate=True)
+
+    with sqlite3.connect(path) as conn:
+        announcement = conn.execute("SELECT min(id) FROM announcements WHERE user_id = 1").fetchone()[0]
+        commented = conn.execute("SELECT announcement_id FROM comments GROUP BY announcement_id"
+                                 " ORDER BY count(*) DESC LIMIT 1").fetchone()[0]
+
+    failures = []
+    with TestClient(app) as client:
+        def token(user_id):
+            response = client.post("/auth/users/login",
+                                   data={"username": user_email(user_id), "password": SEED_PASSWORD})
+            return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        ctx = {"owner": token(1), "other": token(2), "announcement": announcement, "commented": commented,
+               "credentials": {"username": user_email(3), "password": SEED_PASSWORD}}
+        for name, method, url, kwargs, status in checks(ctx):
+            for entry in (cache.user_cache, cache.token_cache, cache.announcement_cache, cache.search_cache):
+                entry.clear()
+            meter.reset()
+            response = client.request(method, url, **kwargs)
+            statements, rows = len(meter.statements), meter.rows
+
+            if response.status_code != status:
+                failures.append(f"{name}: expected {status}, got {response.status_code} {response.text[:200]}")
+                continue
+            if name == "POST /shanyraks/":
+                ctx["created"] = response.json()["id"]
+            elif name == "POST /shanyraks/{id}/comments":
+                ctx["comment"] = response.json()["id"]
+            elif name == "GET /auth/users/favorites/shanyraks":
+                ctx["favorite"] = response.json()[0]["id"]
+
+            max_statements, max_rows = BUDGETS[name]
+            over = statements > max_statements or rows > max_rows
+            if args.report or over:
+                print(f"{'OVER ' if over else ''}{name}: {statements}/{max_statements} statements, "
+                      f"{rows}/{max_rows} rows")
+            if over:
+                failures.append(f"{name}: {statements} statements (budget {max_statements}), "
+                                f"{rows} rows (budget {max_rows})")
+                for statement in meter.statements:
+                    print("    " + " ".join(statement.split())[:160])
+
+    failures += explain_search(database, AnnouncementRepository)
+
+    for failure in failures:
+        print("FAIL " + failure)
+    print(f"{len(BUDGETS)} routes, {len(SEARCH_PLANS)} search plans: {len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Latency of /shanyraks/search with the result cache cold vs. warm.
+
+    python -m benchmarks.search_cache --rows 50000 --requests 500
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="shanyraq-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["DATABASE_CREATE_SCHEMA"] = "1"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+
+    from app import database, models
+    from app.cache import search_cache
+    from app.main import app
+
+    def seed():
+        rng = random.Random(42)
+        with database.engine.begin() as conn:
+            conn.execute(insert(models.Announcement), [
+                {"type": rng.choice(["sell", "rent"]), "price": rng.randint(50, 5000) * 1000.0,
+                 "address": f"street {i}", "area": rng.randint(20, 200), "rooms_count": rng.randint(1, 5),
+                 "description": "x" * 200, "user_id": 1, "total_comments": 0}
+                for i in range(args.rows)
+            ])
+
+    params = {"type": "sell", "rooms_count": 2, "price_from": 1_000_000, "price_until": 3_000_000, "limit": 20}
+
+    def timed(client, clear):
+        samples = []
+        for _ in range(args.requests):
+            if clear:
+                search_cache.clear()
+            started = time.perf_counter()
+            response = client.get("/shanyraks/search", params=params)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200
+        return samples
+
+    # the schema is created by the app's startup
+    with TestClient(app) as client:
+        seed()
+        for label, clear in (("miss", True), ("hit", False)):
+            samples = sorted(timed(client, clear))
+            print(f"{label:>4}: p50 {statistics.median(samples):.3f} ms  "
+                  f"p95 {samples[int(len(samples) * 0.95) - 1]:.3f} ms  ({len(samples)} requests)")
+    print(search_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Fail when a /shanyraks/search filter combination is not served by the index built for it.
+
+    python -m benchmarks.search_plans [--announcements 20000]
+
+Every combination of type, rooms_count, price_from and price_until is run through EXPLAIN QUERY
+PLAN against a seeded scratch database, once with ANALYZE statistics and once without (nothing
+in the app collects them), and must name its ix_announcements_* index. Full-text and geo searches
+must go through announcements_fts and announcements_rtree. Exits 1 on any mismatch;
+benchmarks.query_budget runs the same check.
+"""
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+
+FILTER_VALUES = {"type": "sell", "rooms_count": 2, "price_from": 1_000_000, "price_until": 30_000_000}
+
+
+def expected_index(names) -> str:
+    """The ix_announcements_* index built for this set of search filters."""
+    equality = [name for name in ("type", "rooms_count") if name in names]
+    return "_".join(["ix_announcements"] + equality + ["price"])
+
+
+# (filters, name that must appear in the plan) for every combination /shanyraks/search builds,
+# plus the full-text and geo searches, which go through their virtual tables.
+SEARCH_PLANS = [
+    ({name: FILTER_VALUES[name] for name in names}, expected_index(names))
+    for size in range(1, len(FILTER_VALUES) + 1)
+    for names in itertools.combinations(FILTER_VALUES, size)
+] + [
+    ({"q": "balcony metro"}, "announcements_fts"),
+    ({"geo": ((43.2, 43.3, 76.8, 76.9), None)}, "announcements_rtree"),
+    ({"geo": ((43.2, 43.3, 76.8, 76.9), None), "type": "sell", "rooms_count": 2}, "announcements_rtree"),
+]
+
+
+def explain_search(database, repository):
+    """Return the search filter combinations whose plan scans announcements or uses another index."""
+    failures = []
+    with database.SessionLocal() as session:
+        for filters, expected in SEARCH_PLANS:
+            query = repository.search_announcements_query(session, **filters)
+            sql = str(query.statement.compile(database.engine, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+            scans = any(step.startswith("SCAN announcements") and "VIRTUAL TABLE" not in step for step in plan)
+            if scans or not any(f"{expected} " in step or step.endswith(expected) for step in plan):
+                failures.append(f"search {filters}: expected {expected}, got {plan}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--announcements", type=int, default=20000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="shanyraq-plans-"), "plans.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["PASSWORD_HASH_COST"] = os.getenv("PASSWORD_HASH_COST", "10")
+
+    from benchmarks.seed import seed
+    seed(path, users=50, announcements=args.announcements, comments=0, favorites=0)
+
+    from app import database
+    from app.announcements_repository import AnnouncementRepository
+
+    failures = [f"with statistics: {failure}" for failure in explain_search(database, AnnouncementRepository)]
+    with database.engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE sqlite_stat1")
+    database.engine.dispose()  # the pooled connection has the statistics loaded
+    failures += [f"without statistics: {failure}" for failure in explain_search(database, AnnouncementRepository)]
+
+    for failure in failures:
+        print("FAIL " + failure)
+    print(f"{len(SEARCH_PLANS)} search plans, with and without statistics: {len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
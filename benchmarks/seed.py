@@ -0,0 +1,198 @@
+"""Fill a scratch SQLite file with realistic users, announcements, comments and favorites.
+
+    python -m benchmarks.seed --db /tmp/shanyraq-bench.db --users 10000 --announcements 1000000 \\
+        --comments 2000000 --favorites 500000
+
+Rows go in through one sqlite3 connection with journaling off and the triggers and secondary
+indexes dropped. The indexes are then built once, the FTS and R*Tree indexes and total_comments
+rebuilt in bulk, the triggers restored and ANALYZE run, so the file ends up as if the rows had
+come in through the API. The schema is stamped with the Alembic head. Every user's password is
+SEED_PASSWORD, hashed at the PASSWORD_HASH_COST in effect.
+"""
+import argparse
+import os
+import random
+import re
+import sqlite3
+import time
+
+SEED_PASSWORD = "benchmark-password"
+
+CITIES = {
+    "Almaty": (43.238, 76.889),
+    "Astana": (51.169, 71.449),
+    "Shymkent": (42.341, 69.590),
+    "Karaganda": (49.806, 73.085),
+    "Aktobe": (50.283, 57.167),
+}
+STREETS = ["Abay", "Dostyk", "Tole bi", "Satpayev", "Al-Farabi", "Zhandosov", "Seifullin", "Kabanbay batyr",
+           "Nazarbayev", "Timiryazev", "Gogol", "Furmanov", "Raiymbek", "Tauelsizdik", "Turan"]
+WORDS = ["bright", "spacious", "renovated", "cozy", "quiet", "sunny", "modern", "furnished", "balcony", "parking",
+         "metro", "park", "view", "mountains", "school", "kindergarten", "elevator", "security", "new", "building",
+         "kitchen", "storage", "heating", "center", "family", "students", "pets", "allowed", "owner", "urgent"]
+SELL_PRICE_PER_M2 = (250_000, 900_000)
+RENT_PRICE_PER_M2 = (1_500, 6_000)
+ROOMS = [1] * 30 + [2] * 35 + [3] * 20 + [4] * 10 + [5] * 5
+START = 1_729_209_600  # 2024-10-18, unix time
+SPAN = 730 * 86400
+POOL = 4096
+BATCH = 50_000
+
+
+def user_email(user_id: int) -> str:
+    return f"user{user_id}@example.com"
+
+
+def _pool(rng, make):
+    # Row text is drawn from a fixed pool: building a fresh string per row would dominate the run time.
+    return [make() for _ in range(POOL)]
+
+
+def _users(rng, count, password_hash):
+    cities = list(CITIES)
+    for user_id in range(1, count + 1):
+        yield (user_id, f"+7700{user_id:07d}", user_email(user_id), f"User {user_id}", password_hash,
+               cities[user_id % len(cities)])
+
+
+def _announcements(rng, count, users):
+    random = rng.random
+    cities = list(CITIES.items())
+    addresses = _pool(rng, lambda: f"{rng.choice(STREETS)} {rng.randint(1, 300)}")
+    descriptions = _pool(rng, lambda: " ".join(rng.choices(WORDS, k=rng.randint(8, 30))))
+    step = SPAN / max(count, 1)
+    for announcement_id in range(1, count + 1):
+        city, (lat, lng) = cities[int(random() * len(cities))]
+        selling = random() < 0.6
+        rooms = ROOMS[int(random() * len(ROOMS))]
+        area = round(rooms * (16 + 12 * random()) + 8 + 12 * random(), 1)
+        low, high = SELL_PRICE_PER_M2 if selling else RENT_PRICE_PER_M2
+        price = float(round(area * (low + (high - low) * random()), -3))
+        located = random() < 0.9
+        yield (
+            announcement_id, "sell" if selling else "rent", price,
+            f"{addresses[int(random() * POOL)]}, {city}", area, rooms, descriptions[int(random() * POOL)],
+            START + step * announcement_id,
+            lat + 0.3 * random() - 0.15 if located else None,
+            lng + 0.3 * random() - 0.15 if located else None,
+            1 + int(random() * users),
+        )
+
+
+def _comments(rng, count, users, announcements):
+    random = rng.random
+    contents = _pool(rng, lambda: " ".join(rng.choices(WORDS, k=rng.randint(3, 15))))
+    step = SPAN / max(count, 1)
+    for comment_id in range(1, count + 1):
+        yield (comment_id, contents[int(random() * POOL)], 1 + int(random() * users),
+               1 + int(random() * announcements), START + step * comment_id)
+
+
+def _favorites(rng, count, users, announcements):
+    random = rng.random
+    seen = set()
+    for _ in range(count):
+        pair = (1 + int(random() * users), 1 + int(random() * announcements))
+        if pair not in seen:
+            seen.add(pair)
+            yield pair
+
+
+def _batched(conn, sql, rows):
+    while True:
+        chunk = [row for _, row in zip(range(BATCH), rows)]
+        if not chunk:
+            return
+        conn.executemany(sql, chunk)
+
+
+def seed(path, users, announcements, comments, favorites, seed=42):
+    """Create and fill the database at path; returns {table: rows} (favorites are deduplicated)."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import create_engine
+
+    from app import database, models
+    from app.security import hash_password_sync
+
+    engine = create_engine(f"sqlite:///{path}")
+    database.Base.metadata.create_all(engine)
+    engine.dispose()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    alembic_cfg = Config(os.path.join(root, "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", os.path.join(root, "alembic"))
+    command.stamp(alembic_cfg, "head")
+
+    triggers = [statement for statement in
+                models.ANNOUNCEMENTS_FTS_DDL + models.ANNOUNCEMENTS_RTREE_DDL + models.COMMENTS_COUNTER_DDL
+                if statement.startswith("CREATE TRIGGER")]
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path, isolation_level=None)
+    for pragma in ("journal_mode=OFF", "synchronous=OFF", "cache_size=-262144", "temp_store=MEMORY"):
+        conn.execute(f"PRAGMA {pragma}")
+    conn.execute("BEGIN")
+    for statement in triggers:
+        conn.execute("DROP TRIGGER " + re.match(r"CREATE TRIGGER (\w+)", statement).group(1))
+    # building an index once over sorted data beats updating it on every insert
+    indexes = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL").fetchall()
+    for name, _ in indexes:
+        conn.execute(f"DROP INDEX {name}")
+
+    _batched(conn, "INSERT INTO users (id, phone, email, name, password, city) VALUES (?, ?, ?, ?, ?, ?)",
+             _users(rng, users, hash_password_sync(SEED_PASSWORD)))
+    # timestamps are passed as unix time and formatted by SQLite, as CURRENT_TIMESTAMP would store them
+    _batched(conn, "INSERT INTO announcements (id, type, price, address, area, rooms_count, description, created_at,"
+                   " latitude, longitude, user_id, total_comments, version)"
+                   " VALUES (?, ?, ?, ?, ?, ?, ?, datetime(?, 'unixepoch'), ?, ?, ?, 0, 1)",
+             _announcements(rng, announcements, users))
+    _batched(conn, "INSERT INTO comments (id, content, user_id, announcement_id, created_at)"
+                   " VALUES (?, ?, ?, ?, datetime(?, 'unixepoch'))",
+             _comments(rng, comments, users, announcements))
+    _batched(conn, "INSERT INTO user_favorites (user_id, announcement_id) VALUES (?, ?)",
+             _favorites(rng, favorites, users, announcements))
+    for _, sql in indexes:
+        conn.execute(sql)
+
+    # what the dropped triggers would have maintained row by row
+    conn.execute("INSERT INTO announcements_fts(announcements_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO announcements_rtree SELECT id, latitude, latitude, longitude, longitude FROM announcements"
+                 " WHERE latitude IS NOT NULL AND longitude IS NOT NULL")
+    conn.execute("UPDATE announcements SET total_comments = counts.total, version = version + counts.total"
+                 " FROM (SELECT announcement_id, count(*) AS total FROM comments GROUP BY announcement_id) AS counts"
+                 " WHERE announcements.id = counts.announcement_id")
+    for statement in triggers:
+        conn.execute(statement)
+    conn.execute("COMMIT")
+    conn.execute("PRAGMA analysis_limit=1000")  # sampled statistics, as PRAGMA optimize collects them
+    conn.execute("ANALYZE")
+
+    counts = {table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+              for table in ("users", "announcements", "comments", "user_favorites")}
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="SQLite file to create; must not exist")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--announcements", type=int, default=100_000)
+    parser.add_argument("--comments", type=int, default=200_000)
+    parser.add_argument("--favorites", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} already exists")
+    started = time.perf_counter()
+    counts = seed(os.path.abspath(args.db), args.users, args.announcements, args.comments, args.favorites, args.seed)
+    elapsed = time.perf_counter() - started
+    print(", ".join(f"{table}: {rows}" for table, rows in counts.items()) + f" in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
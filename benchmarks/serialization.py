@@ -0,0 +1,72 @@
+"""Cost of serializing 1,000 announcements: generic jsonable_encoder vs. typed schemas.
+
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app import models
+from app.announcements_repository import AnnouncementResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def make_rows(count: int):
+    return [
+        models.Announcement(
+            id=i, type="sell" if i % 2 else "rent", price=1000.0 + i, address=f"Abay avenue {i}", area=54.5,
+            rooms_count=1 + i % 4, description="Bright two-room flat near the metro. " * 5,
+            created_at=datetime(2026, 10, 18, 12, 0, i % 60), latitude=43.2 + i / 1e5, longitude=76.9 + i / 1e5,
+            user_id=1 + i % 50, total_comments=i % 7, version=1,
+        )
+        for i in range(count)
+    ]
+
+
+def measure(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    adapter = TypeAdapter(List[AnnouncementResponse])
+
+    cases = {
+        # what FastAPI did for the untyped list endpoints
+        "before: jsonable_encoder + json.dumps":
+            lambda: json.dumps(jsonable_encoder(rows)).encode(),
+        "after: schema dump_json": lambda: adapter.dump_json(adapter.validate_python(rows)),
+    }
+    if orjson:
+        cases["after: schema dump_python + orjson"] = lambda: orjson.dumps(
+            adapter.dump_python(adapter.validate_python(rows), mode="json"))
+
+    baseline = None
+    for label, fn in cases.items():
+        elapsed = measure(fn, args.repeat) * 1000 / args.rows
+        baseline = baseline or elapsed
+        print(f"{label:<40} {elapsed:8.3f} ms / 1,000 rows  ({baseline / elapsed:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
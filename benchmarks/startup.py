@@ -0,0 +1,90 @@
+"""Cold start to first response, in a fresh process per run.
+
+    python -m benchmarks.startup --runs 5
+
+Each run starts a new interpreter that imports app.main, runs the lifespan startup and sends
+its first requests through httpx's ASGI transport. Modes: the default startup (schema check and
+prewarm), the schema check without prewarm, and the old behaviour of running create_all when
+the app is imported. Reported per mode as the median over --runs: process start to first
+response, and the import, startup and first/second request times that add up to it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {
+    "check + prewarm": {"DATABASE_PREWARM": "1"},
+    "check only": {"DATABASE_PREWARM": "0"},
+    "create_all at import": {"DATABASE_PREWARM": "0", "DATABASE_SCHEMA_CHECK": "off", "LEGACY_CREATE_ALL": "1"},
+}
+
+
+def child():
+    started = time.perf_counter()
+    import asyncio
+
+    import httpx
+
+    if os.getenv("LEGACY_CREATE_ALL"):
+        from app import database, models  # noqa: F401
+        database.Base.metadata.create_all(bind=database.engine)
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def run():
+        timings = {"import_ms": (imported - started) * 1000}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async with app.router.lifespan_context(app):
+                ready = time.perf_counter()
+                timings["startup_ms"] = (ready - imported) * 1000
+                response = await client.get("/shanyraks/search", params={"type": "sell", "rooms_count": 2})
+                assert response.status_code == 200, response.text
+                first = time.perf_counter()
+                timings["first_request_ms"] = (first - ready) * 1000
+                response = await client.get("/shanyraks/search", params={"type": "rent", "rooms_count": 3})
+                assert response.status_code == 200, response.text
+                timings["second_request_ms"] = (time.perf_counter() - first) * 1000
+        return timings
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--announcements", type=int, default=20000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    path = os.path.join(tempfile.mkdtemp(prefix="shanyraq-startup-"), "startup.db")
+    subprocess.run([sys.executable, "-m", "benchmarks.seed", "--db", path, "--users", "100",
+                    "--announcements", str(args.announcements), "--comments", str(args.announcements),
+                    "--favorites", "1000"], check=True, capture_output=True)
+
+    for mode, env in MODES.items():
+        runs = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            result = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--child"], check=True,
+                                    capture_output=True, text=True,
+                                    env={**os.environ, "DATABASE_URL": f"sqlite:///{path}", **env})
+            timings = json.loads(result.stdout.strip().splitlines()[-1])
+            timings["first_response_ms"] = (time.perf_counter() - started) * 1000 - timings["second_request_ms"]
+            runs.append(timings)
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{mode:<22} first response {median['first_response_ms']:7.1f} ms  (import {median['import_ms']:6.1f},"
+              f" startup {median['startup_ms']:6.1f}, first request {median['first_request_ms']:6.1f},"
+              f" second request {median['second_request_ms']:5.1f})")
+
+
+if __name__ == "__main__":
+    main()
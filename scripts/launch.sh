@@ -1,4 +1,5 @@
 #!/usr/bin/env bash
+set -e
 
 # Set defaults if not provided in environment
 : "${MODULE_NAME:=app.main}"
@@ -6,6 +7,12 @@
 : "${APP_MODULE:=$MODULE_NAME:$VARIABLE_NAME}"
 : "${HOST:=0.0.0.0}"
 : "${PORT:=8000}"
+: "${DATABASE_CREATE_SCHEMA:=1}"
+export DATABASE_CREATE_SCHEMA
+
+# Bring the schema to the Alembic head once (an empty database is created); the workers only
+# check it on startup, and a failed migration stops the launch
+python -m app.startup
 
 # Start uvicorn with live-reload
 uvicorn \